@@ -1,10 +1,27 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
 from datetime import datetime
+from functools import partial
+import importlib.util
+import io
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+import unicodedata
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from relatorios import ARQUIVOS, assinatura_fontes, listar_contas, versao_contas
+
+# Início da execução do script (base para o tempo até a primeira pintura)
+INICIO_SCRIPT = time.perf_counter()
+
+# pandas, numpy e plotly são importados mais abaixo, depois da prévia do modo de início rápido
 
 # Configuração da página
 st.set_page_config(
@@ -85,46 +102,628 @@ def clean_number(value):
             return 0.0
     return float(value) if pd.notna(value) else 0.0
 
-# Carregar dados
-@st.cache_data
-def load_data():
-    # Dados principais - ATUALIZADOS PARA OS NOVOS NOMES DE ARQUIVO
-    campanhas = pd.read_csv('Campanhas(2025.07.08-2025.10.17).csv')
-    dispositivos = pd.read_csv('Dispositivos(2025.07.08-2025.10.17).csv')
-    idade = pd.read_csv('Informações_demográficas(Idade_2025.07.08-2025.10.17).csv')
-    sexo = pd.read_csv('Informações_demográficas(Sexo_2025.07.08-2025.10.17).csv')
-    sexo_idade = pd.read_csv('Informações_demográficas(Sexo_Idade_2025.07.08-2025.10.17).csv')
-    palavras_chave = pd.read_csv('Palavras-chave_de_pesquisa(2025.07.08-2025.10.17).csv')
-    pesquisas = pd.read_csv('Pesquisas(Palavra_2025.07.08-2025.10.17).csv')
-    dia_hora = pd.read_csv('Dia_e_hora(Dia_2025.07.08-2025.10.17).csv')
-    hora = pd.read_csv('Dia_e_hora(Hora_2025.07.08-2025.10.17).csv')
-    dia_hora_detalhado = pd.read_csv('Dia_e_hora(Dia_Hora_2025.07.08-2025.10.17).csv')
-    
-    # OBS: 'Série_temporal' e 'Redes' foram removidos por não estarem na lista de arquivos.
+# --- Instrumentação de desempenho ---
+# Ativada com DASHBOARD_PERF=1. Registra tempo, linhas processadas e pico de memória
+# (tracemalloc) de cada etapa e grava um arquivo no formato texto do Prometheus
+# (compatível com o textfile collector do node_exporter).
+# O tracemalloc mede o processo inteiro e reset_peak vale para todas as threads: o pico
+# só é registrado em execuções sem nenhuma outra sessão medindo ao mesmo tempo.
+# Desativada, `medir` devolve sempre o mesmo contexto nulo: nada é medido nem alocado.
+PERF_ATIVO = os.environ.get('DASHBOARD_PERF', '0') == '1'
+PERF_ARQUIVO = os.environ.get('DASHBOARD_PERF_ARQUIVO', 'metricas_dashboard.prom')
 
-    # Limpar dados monetários e numéricos
-    # Campanhas
-    campanhas['Custo_num'] = campanhas['Custo'].apply(clean_currency_value)
-    campanhas['Cliques_num'] = campanhas['Cliques'].apply(clean_number)
-    campanhas['CTR_num'] = campanhas['CTR'].apply(clean_percentage)
-    
-    # Dispositivos
-    dispositivos['Custo_num'] = dispositivos['Custo'].apply(clean_currency_value)
-    dispositivos['Impressões_num'] = dispositivos['Impressões'].apply(clean_number)
-    dispositivos['Cliques_num'] = dispositivos['Cliques'].apply(clean_number)
-    
-    # Palavras-chave
+if PERF_ATIVO and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+class _MedicaoNula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, nome, valor):
+        # Permite `m.linhas = ...` mesmo com a instrumentação desligada
+        pass
+
+_MEDICAO_NULA = _MedicaoNula()
+
+# Registro compartilhado por todas as sessões do processo
+@st.cache_resource
+def _registro_desempenho():
+    # 'raizes': medições de primeiro nível em andamento, de todas as threads
+    return {'lock': threading.Lock(), 'etapas': {}, 'pilhas': threading.local(), 'raizes': set()}
+
+class _Medicao:
+    def __init__(self, registro, etapa, linhas):
+        self.registro = registro
+        self.etapa = etapa
+        self.linhas = linhas
+        self.pico = 0
+        self.concorrente = False
+
+    def _pilha(self):
+        pilhas = self.registro['pilhas']
+        if not hasattr(pilhas, 'ativa'):
+            pilhas.ativa = []
+        return pilhas.ativa
+
+    def __enter__(self):
+        pilha = self._pilha()
+        atual, pico = tracemalloc.get_traced_memory()
+        if pilha:
+            # Guarda o pico do pai antes de zerá-lo para a etapa filha
+            pai = pilha[-1]
+            pai.pico = max(pai.pico, pico)
+            self.nome = f"{pai.nome}/{self.etapa}"
+            self.raiz = pai.raiz
+        else:
+            self.nome = self.etapa
+            self.raiz = self
+            registro = self.registro
+            with registro['lock']:
+                # Outra sessão medindo agora: o pico de nenhuma das duas é confiável
+                if registro['raizes']:
+                    self.concorrente = True
+                    for outra in registro['raizes']:
+                        outra.concorrente = True
+                registro['raizes'].add(self)
+        pilha.append(self)
+        self.memoria_inicial = atual
+        tracemalloc.reset_peak()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duracao = time.perf_counter() - self.inicio
+        pico = max(self.pico, tracemalloc.get_traced_memory()[1])
+        pilha = self._pilha()
+        pilha.pop()
+        if pilha:
+            pilha[-1].pico = max(pilha[-1].pico, pico)
+        else:
+            with self.registro['lock']:
+                self.registro['raizes'].discard(self)
+        pico_bytes = None if self.raiz.concorrente else max(pico - self.memoria_inicial, 0)
+        registrar_etapa(self.nome, duracao, self.linhas, pico_bytes)
+        return False
+
+def medir(etapa, linhas=None):
+    if not PERF_ATIVO:
+        return _MEDICAO_NULA
+    return _Medicao(_registro_desempenho(), etapa, linhas)
+
+def registrar_etapa(nome, duracao, linhas, pico_bytes):
+    registro = _registro_desempenho()
+    with registro['lock']:
+        etapa = registro['etapas'].setdefault(nome, {
+            'execucoes': 0,
+            'tempo_total_s': 0.0,
+            'ultimo_tempo_s': 0.0,
+            'linhas': 0,
+            'pico_memoria_bytes': 0,
+        })
+        etapa['execucoes'] += 1
+        etapa['tempo_total_s'] += duracao
+        etapa['ultimo_tempo_s'] = duracao
+        if linhas is not None:
+            etapa['linhas'] = linhas
+        # None: execução com outras sessões ativas, sem pico confiável
+        if pico_bytes is not None:
+            etapa['pico_memoria_bytes'] = max(etapa['pico_memoria_bytes'], pico_bytes)
+
+def _rotulo_prometheus(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Grava as métricas no formato texto do Prometheus (troca atômica do arquivo)
+def exportar_metricas_prometheus(caminho=PERF_ARQUIVO):
+    registro = _registro_desempenho()
+    with registro['lock']:
+        etapas = {nome: dict(valores) for nome, valores in registro['etapas'].items()}
+
+    metricas = [
+        ('dashboard_etapa_duracao_segundos', 'gauge', 'Duração da última execução da etapa.', 'ultimo_tempo_s'),
+        ('dashboard_etapa_duracao_segundos_total', 'counter', 'Tempo acumulado na etapa.', 'tempo_total_s'),
+        ('dashboard_etapa_execucoes_total', 'counter', 'Número de execuções da etapa.', 'execucoes'),
+        ('dashboard_etapa_linhas', 'gauge', 'Linhas processadas na última execução da etapa.', 'linhas'),
+        ('dashboard_etapa_memoria_pico_bytes', 'gauge', 'Maior pico de memória do processo durante a etapa (tracemalloc), só de execuções sem outras sessões ativas.', 'pico_memoria_bytes'),
+    ]
+    linhas = []
+    for nome_metrica, tipo, ajuda, chave in metricas:
+        linhas.append(f"# HELP {nome_metrica} {ajuda}")
+        linhas.append(f"# TYPE {nome_metrica} {tipo}")
+        for etapa, valores in sorted(etapas.items()):
+            linhas.append(f'{nome_metrica}{{etapa="{_rotulo_prometheus(etapa)}"}} {valores[chave]}')
+
+    # Contadores do gerenciador de dados compartilhados
+    estatisticas = _gerenciador_dados().estatisticas()
+    for nome_metrica, tipo, ajuda, valor in [
+        ('dashboard_dados_acertos_total', 'counter', 'Pedidos de dados atendidos da memória.', estatisticas['acertos']),
+        ('dashboard_dados_faltas_total', 'counter', 'Pedidos de dados que exigiram carregar a conta.', estatisticas['faltas']),
+        ('dashboard_dados_despejos_total', 'counter', 'Contas removidas da memória por LRU.', estatisticas['despejos']),
+        ('dashboard_dados_memoria_bytes', 'gauge', 'Memória ocupada pelas contas carregadas.', estatisticas['memoria_bytes']),
+        ('dashboard_dados_orcamento_bytes', 'gauge', 'Orçamento de memória das contas carregadas.', estatisticas['orcamento_bytes']),
+    ]:
+        linhas.append(f"# HELP {nome_metrica} {ajuda}")
+        linhas.append(f"# TYPE {nome_metrica} {tipo}")
+        linhas.append(f"{nome_metrica} {valor}")
+    linhas.append("# HELP dashboard_dados_referencias Sessões usando cada conta carregada.")
+    linhas.append("# TYPE dashboard_dados_referencias gauge")
+    for conta, valores in sorted(estatisticas['contas'].items()):
+        linhas.append(f'dashboard_dados_referencias{{conta="{_rotulo_prometheus(conta)}"}} {valores["refs"]}')
+
+    gravar_arquivo_atomico(caminho, '\n'.join(linhas) + '\n')
+
+# Grava um arquivo de texto com troca atômica. O temporário tem nome único (na mesma pasta,
+# para o os.replace não cruzar sistemas de arquivos): sessões simultâneas não colidem.
+# O NamedTemporaryFile nasce com modo 0600; o arquivo final fica legível por outros usuários
+# (o node_exporter costuma rodar com outro usuário).
+def gravar_arquivo_atomico(caminho, conteudo):
+    nome = os.path.basename(caminho)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(os.path.abspath(caminho)),
+                                     prefix=f'.{nome}.', suffix='.tmp', delete=False) as arquivo:
+        arquivo.write(conteudo)
+    try:
+        os.chmod(arquivo.name, 0o644)
+        os.replace(arquivo.name, caminho)
+    except OSError:
+        os.unlink(arquivo.name)
+        raise
+
+# Exibe um gráfico Plotly medindo o tempo de serialização/envio
+def exibir_grafico(fig):
+    with medir('plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
+
+# Lê um relatório CSV registrando tempo e linhas lidas
+def ler_csv(etapa, caminho, **opcoes):
+    with medir(f'read_csv:{etapa}') as m:
+        df = pd.read_csv(caminho, **opcoes)
+        m.linhas = len(df)
+    return df
+
+# --- Leitura em blocos ---
+# Com DASHBOARD_LEITURA_EM_BLOCOS=1 os relatórios de palavras-chave e pesquisas (os maiores)
+# são lidos em blocos de DASHBOARD_TAMANHO_BLOCO linhas e reduzidos aos agregados usados
+# pelas abas, sem manter o relatório inteiro em memória. No modo normal os mesmos agregados
+# são calculados com o relatório inteiro como bloco único, então os dois modos coincidem.
+LEITURA_EM_BLOCOS = os.environ.get('DASHBOARD_LEITURA_EM_BLOCOS', '0') == '1'
+TAMANHO_BLOCO = int(os.environ.get('DASHBOARD_TAMANHO_BLOCO', '100000'))
+TOP_N = 10
+COLUNA_PALAVRA_CHAVE = 'Palavra-chave da rede de pesquisa'
+METRICAS_PALAVRA_CHAVE = ['Custo_num', 'Cliques_num']
+METRICAS_TERMO_PESQUISA = ['Custo_num', 'Cliques_num', 'Impressões_num', 'Conversões_num']
+LIMITE_DISPERSAO = 5000  # pontos no gráfico Custo/Clique vs CTR (maiores em cliques)
+
+# Esses relatórios são lidos como texto para que a inferência de tipos não dependa do bloco
+# e as regras de limpeza (ponto de milhar, vírgula decimal) valham para todas as linhas
+OPCOES_LEITURA_TEXTO = {'dtype': str}
+
+# Soma de ponto flutuante sem erro acumulado (parciais de Shewchuk, como em math.fsum):
+# o total não depende de como as linhas foram divididas em blocos
+class SomaExata:
+    def __init__(self):
+        self.parciais = []
+
+    def adicionar(self, valores):
+        parciais = self.parciais
+        for x in valores:
+            i = 0
+            for y in parciais:
+                if abs(x) < abs(y):
+                    x, y = y, x
+                soma = x + y
+                resto = y - (soma - x)
+                if resto:
+                    parciais[i] = resto
+                    i += 1
+                x = soma
+            parciais[i:] = [x]
+
+    def valor(self):
+        return math.fsum(self.parciais)
+
+# Mantém as `n` maiores linhas vistas até agora (mesma ordem e desempates de nlargest)
+def acumular_maiores(atuais, bloco, n, coluna):
+    candidatos = bloco.nlargest(n, coluna)
+    if atuais is None:
+        return candidatos
+    return pd.concat([atuais, candidatos]).nlargest(n, coluna)
+
+# Palavras-chave com desempenho
+def filtro_com_cliques(palavras_chave):
+    return palavras_chave['Cliques_num'] > 0
+
+# Palavras-chave com Custo > 0, mas Cliques == 0 (dinheiro gasto sem retorno)
+def filtro_gastando_sem_clique(palavras_chave):
+    return (palavras_chave['Custo_num'] > 0) & (palavras_chave['Cliques_num'] == 0)
+
+def limpar_palavras_chave(palavras_chave):
     palavras_chave['Custo_num'] = palavras_chave['Custo'].apply(clean_currency_value)
     palavras_chave['Cliques_num'] = palavras_chave['Cliques'].apply(clean_number)
     palavras_chave['CTR_num'] = palavras_chave['CTR'].apply(clean_percentage)
-    
-    # Pesquisas
+    return palavras_chave
+
+# Relatório de termos de pesquisa (Pesquisas por termo pesquisado, não por palavra)
+def limpar_termos_pesquisa(termos):
+    termos['Custo_num'] = termos['Custo'].apply(clean_currency_value)
+    termos['Cliques_num'] = termos['Cliques'].apply(clean_number)
+    termos['Impressões_num'] = termos['Impressões'].apply(clean_number)
+    termos['Conversões_num'] = termos['Conversões'].apply(clean_number)
+    return termos
+
+def limpar_pesquisas(pesquisas):
     # COLUNA 'Palavra' é o termo de pesquisa real
-    pesquisas.rename(columns={'Palavra': 'Pesquisar'}, inplace=True) # Renomeia para compatibilidade
+    pesquisas = pesquisas.rename(columns={'Palavra': 'Pesquisar'}) # Renomeia para compatibilidade
     pesquisas['Custo_num'] = pesquisas['Custo'].apply(clean_currency_value)
     pesquisas['Cliques_num'] = pesquisas['Cliques'].apply(clean_number)
     pesquisas['Impressões_num'] = pesquisas['Impressões'].apply(clean_number)
     pesquisas['Conversões_num'] = pesquisas['Conversões'].apply(clean_number)
+    return pesquisas
+
+# Lê e limpa um relatório bloco a bloco
+def ler_blocos(etapa, caminho, limpar):
+    with medir(f'leitura_em_blocos:{etapa}') as m:
+        linhas = 0
+        for bloco in pd.read_csv(caminho, chunksize=TAMANHO_BLOCO, **OPCOES_LEITURA_TEXTO):
+            linhas += len(bloco)
+            yield limpar(bloco)
+        m.linhas = linhas
+
+# Agregados da aba de palavras-chave
+def resumir_palavras_chave(blocos):
+    total = com_cliques = gastando_sem_clique = 0
+    custo_sem_clique = SomaExata()
+    top_ctr = top_cliques = dispersao = None
+    por_termo = None
+
+    for bloco in blocos:
+        ativas = bloco[filtro_com_cliques(bloco)]
+        sem_clique = bloco[filtro_gastando_sem_clique(bloco)]
+
+        total += len(bloco)
+        com_cliques += len(ativas)
+        gastando_sem_clique += len(sem_clique)
+        custo_sem_clique.adicionar(sem_clique['Custo_num'].tolist())
+        top_ctr = acumular_maiores(top_ctr, ativas, TOP_N, 'CTR_num')
+        top_cliques = acumular_maiores(top_cliques, ativas, TOP_N, 'Cliques_num')
+        dispersao = acumular_maiores(dispersao, ativas, LIMITE_DISPERSAO, 'Cliques_num')
+        por_termo = acumular_por_termo(por_termo, bloco, COLUNA_PALAVRA_CHAVE, METRICAS_PALAVRA_CHAVE)
+
+    if dispersao is not None:
+        dispersao = dispersao.assign(Custo_por_Clique=dispersao['Custo_num'] / dispersao['Cliques_num'])
+
+    return {
+        'total': total,
+        'com_cliques': com_cliques,
+        'gastando_sem_clique': gastando_sem_clique,
+        'custo_sem_clique': custo_sem_clique.valor(),
+        'top_ctr': top_ctr,
+        'top_cliques': top_cliques,
+        'dispersao': dispersao,
+        'grupos': resumir_grupos(somar_por_termo(por_termo, COLUNA_PALAVRA_CHAVE, METRICAS_PALAVRA_CHAVE),
+                                 COLUNA_PALAVRA_CHAVE, METRICAS_PALAVRA_CHAVE)[1],
+    }
+
+# Agregados do relatório de pesquisas
+def resumir_pesquisas(blocos):
+    total = 0
+    conversoes = SomaExata()
+    top_cliques = None
+
+    for bloco in blocos:
+        total += len(bloco)
+        conversoes.adicionar(bloco['Conversões_num'].tolist())
+        top_cliques = acumular_maiores(top_cliques, bloco, TOP_N, 'Cliques_num')
+
+    return {
+        'total': total,
+        'conversoes': conversoes.valor(),
+        'top_cliques': top_cliques,
+    }
+
+# --- Agrupamento de termos semelhantes (MinHash/LSH) ---
+# Variações como "casa para alugar em gramado" / "casas para alugar gramado" viram um grupo só.
+# Cada termo é reduzido a um conjunto de palavras (sem acentos, stopwords e plurais); conjuntos
+# iguais caem juntos direto e os parecidos são achados por MinHash com LSH em faixas, sem
+# comparar todos os pares. Os candidatos de cada faixa só unem grupos se a similaridade de
+# Jaccard exata entre os conjuntos passar do mínimo (evita encadear "aluguel" com "venda").
+PERMUTACOES_MINHASH = 64
+FAIXAS_LSH = 16  # 16 faixas de 4 linhas: candidatos a partir de ~50% de similaridade
+SIMILARIDADE_MINIMA = 0.8  # Jaccard para unir dois termos (ex.: 4 palavras em comum de 5)
+BLOCO_MINHASH = 50_000  # conjuntos por lote no cálculo das assinaturas
+PRIMO_MINHASH = (1 << 31) - 1
+STOPWORDS_PT = frozenset(
+    'a o as os um uma uns umas de da das do dos em na nas no nos num numa para pra pro por '
+    'pelo pela pelos pelas com sem e ou ao aos que se'.split()
+)
+SUFIXOS_PLURAL = [('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'),
+                  ('uis', 'ul'), ('res', 'r'), ('zes', 'z'), ('ns', 'm')]
+
+# Forma singular aproximada de uma palavra já sem acentos
+def singular(palavra):
+    if len(palavra) <= 3 or not palavra.endswith('s'):
+        return palavra
+    if len(palavra) > 4:
+        for sufixo, troca in SUFIXOS_PLURAL:
+            if palavra.endswith(sufixo):
+                return palavra[:-len(sufixo)] + troca
+    return palavra[:-1]
+
+# Conjunto de palavras que representa o termo (ordem e repetições não importam)
+def normalizar_termo(termo, cache_palavras):
+    texto = unicodedata.normalize('NFKD', str(termo).lower()).encode('ascii', 'ignore').decode('ascii')
+    palavras = re.findall(r'[a-z0-9]+', texto)
+    # Termo só de stopwords ("para a") fica com elas; termo sem letras vira um grupo próprio
+    relevantes = [p for p in palavras if p not in STOPWORDS_PT] or palavras or ['\0' + str(termo)]
+    conjunto = set()
+    for palavra in relevantes:
+        forma = cache_palavras.get(palavra)
+        if forma is None:
+            forma = cache_palavras[palavra] = singular(palavra)
+        conjunto.add(forma)
+    return tuple(sorted(conjunto))
+
+# Assinaturas MinHash (uma linha por conjunto) a partir dos ids das palavras em formato CSR
+def assinaturas_minhash(ids_palavras, inicios, qtd_palavras):
+    rng = np.random.default_rng(0)
+    a = rng.integers(1, PRIMO_MINHASH, size=PERMUTACOES_MINHASH, dtype=np.uint64)
+    b = rng.integers(0, PRIMO_MINHASH, size=PERMUTACOES_MINHASH, dtype=np.uint64)
+    hashes = np.empty((qtd_palavras, PERMUTACOES_MINHASH), dtype=np.uint32)
+    for inicio in range(0, qtd_palavras, BLOCO_MINHASH):
+        x = np.arange(inicio + 1, min(inicio + BLOCO_MINHASH, qtd_palavras) + 1, dtype=np.uint64)[:, None]
+        hashes[inicio:inicio + BLOCO_MINHASH] = (x * a + b) % PRIMO_MINHASH
+
+    total = len(inicios) - 1
+    assinaturas = np.empty((total, PERMUTACOES_MINHASH), dtype=np.uint32)
+    for inicio in range(0, total, BLOCO_MINHASH):
+        fim = min(inicio + BLOCO_MINHASH, total)
+        trecho = ids_palavras[inicios[inicio]:inicios[fim]]
+        assinaturas[inicio:fim] = np.minimum.reduceat(hashes[trecho], inicios[inicio:fim] - inicios[inicio], axis=0)
+    return assinaturas
+
+# Pares candidatos do LSH (conjuntos que coincidem em pelo menos uma faixa)
+def pares_candidatos(assinaturas):
+    linhas_faixa = PERMUTACOES_MINHASH // FAIXAS_LSH
+    multiplicadores = np.random.default_rng(1).integers(1, 1 << 62, size=linhas_faixa, dtype=np.uint64) | np.uint64(1)
+    indices = np.arange(len(assinaturas))
+    origens, destinos = [], []
+    for faixa in range(FAIXAS_LSH):
+        trecho = assinaturas[:, faixa * linhas_faixa:(faixa + 1) * linhas_faixa].astype(np.uint64)
+        # Colisões do hash da faixa só geram candidatos extras, descartados na confirmação
+        chaves = (trecho * multiplicadores).sum(axis=1)
+        _, primeiro, inverso = np.unique(chaves, return_index=True, return_inverse=True)
+        representante = primeiro[inverso]
+        outros = indices[representante != indices]
+        origens.append(outros)
+        destinos.append(representante[outros])
+
+    pares = np.unique(np.concatenate(origens) * len(assinaturas) + np.concatenate(destinos))
+    return np.divmod(pares, len(assinaturas))
+
+# Similaridade de Jaccard exata de cada par: palavras da origem presentes no destino
+def jaccard_pares(ids_palavras, inicios, qtd_palavras, origens, destinos):
+    tamanhos = np.diff(inicios)
+    conjunto_palavra = np.repeat(np.arange(len(tamanhos)), tamanhos)
+    pertinencia = np.sort(conjunto_palavra * qtd_palavras + ids_palavras)
+    similaridades = np.empty(len(origens))
+    for inicio in range(0, len(origens), BLOCO_MINHASH):
+        origem = origens[inicio:inicio + BLOCO_MINHASH]
+        destino = destinos[inicio:inicio + BLOCO_MINHASH]
+        # Posições das palavras de cada origem em ids_palavras
+        par = np.repeat(np.arange(len(origem)), tamanhos[origem])
+        deslocamento = np.arange(len(par)) - np.repeat(np.cumsum(tamanhos[origem]) - tamanhos[origem], tamanhos[origem])
+        chaves = destino[par] * qtd_palavras + ids_palavras[inicios[origem][par] + deslocamento]
+        posicoes = np.minimum(np.searchsorted(pertinencia, chaves), len(pertinencia) - 1)
+        comuns = np.bincount(par, weights=pertinencia[posicoes] == chaves, minlength=len(origem))
+        similaridades[inicio:inicio + BLOCO_MINHASH] = comuns / (tamanhos[origem] + tamanhos[destino] - comuns)
+    return similaridades
+
+# Componentes conexas do grafo de pares (rótulo = menor índice do componente)
+def componentes_conexas(total, origens, destinos):
+    rotulos = np.arange(total)
+    while True:
+        menores = np.minimum(rotulos[origens], rotulos[destinos])
+        novos = rotulos.copy()
+        np.minimum.at(novos, rotulos[origens], menores)
+        np.minimum.at(novos, rotulos[destinos], menores)
+        # Compressão de caminhos: todos apontam direto para a raiz
+        while True:
+            saltos = novos[novos]
+            if np.array_equal(saltos, novos):
+                break
+            novos = saltos
+        if np.array_equal(novos, rotulos):
+            return rotulos
+        rotulos = novos
+
+# Número do grupo de cada termo (mesma ordem de `termos`)
+def agrupar_termos(termos):
+    cache_palavras = {}
+    conjuntos = {}
+    conjunto_termo = np.fromiter(
+        (conjuntos.setdefault(normalizar_termo(termo, cache_palavras), len(conjuntos)) for termo in termos),
+        dtype=np.int64, count=len(termos))
+    if len(conjuntos) < 2:
+        return conjunto_termo
+
+    vocabulario = {}
+    ids_palavras = np.fromiter(
+        (vocabulario.setdefault(palavra, len(vocabulario)) for conjunto in conjuntos for palavra in conjunto),
+        dtype=np.int64)
+    inicios = np.zeros(len(conjuntos) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, conjuntos), dtype=np.int64, count=len(conjuntos)), out=inicios[1:])
+
+    assinaturas = assinaturas_minhash(ids_palavras, inicios, len(vocabulario))
+    origens, destinos = pares_candidatos(assinaturas)
+    semelhantes = jaccard_pares(ids_palavras, inicios, len(vocabulario), origens, destinos) >= SIMILARIDADE_MINIMA
+    origens, destinos = origens[semelhantes], destinos[semelhantes]
+    rotulos = componentes_conexas(len(conjuntos), origens, destinos)
+    return np.unique(rotulos, return_inverse=True)[1][conjunto_termo]
+
+# Soma as métricas por grupo; o grupo leva o nome do termo com mais cliques (depois custo)
+def resumir_grupos(termos, coluna, metricas):
+    termos = termos.assign(Grupo_id=agrupar_termos(termos[coluna].tolist()))
+    nomes = (termos.sort_values(['Cliques_num', 'Custo_num'], ascending=False, kind='stable')
+                   .drop_duplicates('Grupo_id').set_index('Grupo_id')[coluna])
+    termos['Grupo'] = termos['Grupo_id'].map(nomes)
+    grupos = termos.groupby('Grupo', sort=False).agg(
+        Variações=(coluna, 'size'), **{metrica: (metrica, 'sum') for metrica in metricas})
+    grupos = grupos.sort_values(['Custo_num', 'Cliques_num'], ascending=False, kind='stable').reset_index()
+    return compactar_textos(termos.drop(columns='Grupo_id')), compactar_textos(grupos)
+
+# Soma as métricas de cada termo distinto ao longo dos blocos (base para o agrupamento).
+# Cada bloco é somado ao total acumulado: a memória fica proporcional aos termos distintos,
+# não às linhas lidas.
+def acumular_por_termo(acumulado, bloco, coluna, metricas):
+    somas = bloco.groupby(coluna, sort=False)[metricas].sum()
+    if acumulado is None:
+        return somas
+    return pd.concat([acumulado, somas]).groupby(level=0, sort=False).sum()
+
+def somar_por_termo(acumulado, coluna, metricas):
+    if acumulado is None:
+        return pd.DataFrame(columns=[coluna, *metricas])
+    return acumulado.rename_axis(coluna).reset_index()
+
+# Termos de pesquisa agrupados por semelhança
+def resumir_termos_pesquisa(blocos):
+    total = 0
+    por_termo = None
+    for bloco in blocos:
+        total += len(bloco)
+        por_termo = acumular_por_termo(por_termo, bloco, 'Pesquisar', METRICAS_TERMO_PESQUISA)
+
+    termos, grupos = resumir_grupos(somar_por_termo(por_termo, 'Pesquisar', METRICAS_TERMO_PESQUISA),
+                                    'Pesquisar', METRICAS_TERMO_PESQUISA)
+    return {
+        'total': total,
+        'termos': termos,
+        'grupos': grupos,
+    }
+
+# --- Armazenamento compacto de textos ---
+# As colunas de texto são a maior parte da memória de uma conta (um objeto Python por célula).
+# Na carga, colunas com muitos valores repetidos (status, tipo de correspondência) viram
+# categóricas (códigos inteiros + dicionário) e as demais (palavras-chave, termos, campanhas,
+# valores formatados) viram strings Arrow, num buffer contíguo. A lista "Principais consultas
+# com a palavra" vira uma lista Arrow (offsets + valores) com as consultas codificadas em
+# dicionário, já que as mesmas consultas se repetem entre as palavras. Sem pyarrow, só as
+# categóricas são usadas.
+ARROW_DISPONIVEL = importlib.util.find_spec('pyarrow') is not None
+COLUNA_CONSULTAS = 'Principais consultas com a palavra'
+PROPORCAO_MAXIMA_CATEGORIA = 0.5  # valores distintos / linhas até onde o dicionário compensa
+
+# "(consulta 1, consulta 2)" -> lista Arrow de consultas codificadas em dicionário
+def lista_consultas(serie):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    texto = pa.array(serie.astype(object).where(serie.notna(), None), type=pa.string())
+    internas = pc.replace_substring_regex(texto, r'^\(|\)$', '')
+    listas = pc.split_pattern(internas, ', ')
+    vazias = pc.or_kleene(pc.is_null(listas), pc.equal(internas, ''))
+    listas = pc.if_else(vazias, pa.scalar([], type=listas.type), listas)
+    consultas = pc.dictionary_encode(listas.values)
+    compacta = pa.ListArray.from_arrays(listas.offsets, consultas, mask=pc.is_null(texto))
+    return pd.Series(pd.arrays.ArrowExtensionArray(compacta), index=serie.index, name=serie.name)
+
+# Volta a lista ao texto original do relatório (exportações)
+def texto_consultas(serie):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    listas = pa.array(serie.array)
+    consultas = listas.values.dictionary_decode() if pa.types.is_dictionary(listas.values.type) else listas.values
+    listas = pa.ListArray.from_arrays(listas.offsets, consultas, mask=pc.is_null(listas))
+    texto = pc.binary_join_element_wise('(', pc.binary_join(listas, ', '), ')', '')
+    return pd.Series(texto.to_pandas(), index=serie.index, name=serie.name)
+
+def compactar_textos(df):
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or not (
+                pd.api.types.is_object_dtype(serie.dtype) or pd.api.types.is_string_dtype(serie.dtype)):
+            continue
+        if coluna == COLUNA_CONSULTAS:
+            if ARROW_DISPONIVEL:
+                df[coluna] = lista_consultas(serie)
+        elif serie.nunique() <= len(serie) * PROPORCAO_MAXIMA_CATEGORIA:
+            df[coluna] = serie.astype('category')
+        elif ARROW_DISPONIVEL:
+            df[coluna] = serie.astype('string[pyarrow]')
+    return df
+
+ORDEM_DIAS = ['Domingo', 'Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado']
+
+# Carregar dados
+# Sem st.cache_data: quem guarda o resultado é o GerenciadorDados, compartilhado entre sessões
+def load_data(pasta='.'):
+    # Dados principais - ATUALIZADOS PARA OS NOVOS NOMES DE ARQUIVO
+    # Tudo como texto: sem isso o pandas lê "2.475" (milhar) como 2.475 e os totais ficam errados
+    campanhas = ler_csv('campanhas', os.path.join(pasta, ARQUIVOS['campanhas']), **OPCOES_LEITURA_TEXTO)
+    dispositivos = ler_csv('dispositivos', os.path.join(pasta, ARQUIVOS['dispositivos']), **OPCOES_LEITURA_TEXTO)
+    # Demografia: o cubo vem do Sexo_Idade; Idade e Sexo (só duas colunas) servem para conferência
+    sexo_idade = ler_csv('sexo_idade', os.path.join(pasta, ARQUIVOS['sexo_idade']), **OPCOES_LEITURA_TEXTO)
+    idade = ler_csv('idade', os.path.join(pasta, ARQUIVOS['idade']), usecols=['Faixa de idade', 'Impressões'], **OPCOES_LEITURA_TEXTO)
+    sexo = ler_csv('sexo', os.path.join(pasta, ARQUIVOS['sexo']), usecols=['Sexo', 'Impressões'], **OPCOES_LEITURA_TEXTO)
+    dia_hora = ler_csv('dia_hora', os.path.join(pasta, ARQUIVOS['dia_hora']), **OPCOES_LEITURA_TEXTO)
+    hora = ler_csv('hora', os.path.join(pasta, ARQUIVOS['hora']), **OPCOES_LEITURA_TEXTO)
+    dia_hora_detalhado = ler_csv('dia_hora_detalhado', os.path.join(pasta, ARQUIVOS['dia_hora_detalhado']), **OPCOES_LEITURA_TEXTO)
+    
+    # OBS: 'Série_temporal' e 'Redes' foram removidos por não estarem na lista de arquivos.
+
+    # Limpar dados monetários e numéricos
+    # Campanhas
+    with medir('limpeza:campanhas', linhas=len(campanhas)):
+        campanhas['Custo_num'] = campanhas['Custo'].apply(clean_currency_value)
+        campanhas['Cliques_num'] = campanhas['Cliques'].apply(clean_number)
+        campanhas['CTR_num'] = campanhas['CTR'].apply(clean_percentage)
+        campanhas = compactar_textos(campanhas)
+    
+    # Dispositivos
+    with medir('limpeza:dispositivos', linhas=len(dispositivos)):
+        dispositivos['Custo_num'] = dispositivos['Custo'].apply(clean_currency_value)
+        dispositivos['Impressões_num'] = dispositivos['Impressões'].apply(clean_number)
+        dispositivos['Cliques_num'] = dispositivos['Cliques'].apply(clean_number)
+        # CTR e CPC por dispositivo (usados no gráfico de eficiência da aba 4)
+        dispositivos['CTR'] = (dispositivos['Cliques_num'] / dispositivos['Impressões_num'].replace(0, np.nan) * 100).fillna(0)
+        dispositivos['Custo_por_Clique'] = dispositivos['Custo_num'] / dispositivos['Cliques_num'].replace(0, np.nan)
+    
+    # Palavras-chave e Pesquisas: relatórios inteiros ou lidos em blocos
+    caminho_palavras_chave = os.path.join(pasta, ARQUIVOS['palavras_chave'])
+    caminho_pesquisas = os.path.join(pasta, ARQUIVOS['pesquisas'])
+    caminho_termos_pesquisa = os.path.join(pasta, ARQUIVOS['termos_pesquisa'])
+    tabelas_completas = {}
+    if LEITURA_EM_BLOCOS:
+        resumo_palavras_chave = resumir_palavras_chave(ler_blocos('palavras_chave', caminho_palavras_chave, limpar_palavras_chave))
+        resumo_pesquisas = resumir_pesquisas(ler_blocos('pesquisas', caminho_pesquisas, limpar_pesquisas))
+        with medir('resumo:termos_pesquisa'):
+            resumo_termos_pesquisa = resumir_termos_pesquisa(
+                ler_blocos('termos_pesquisa', caminho_termos_pesquisa, limpar_termos_pesquisa))
+    else:
+        palavras_chave = ler_csv('palavras_chave', caminho_palavras_chave, **OPCOES_LEITURA_TEXTO)
+        pesquisas = ler_csv('pesquisas', caminho_pesquisas, **OPCOES_LEITURA_TEXTO)
+        termos_pesquisa = ler_csv('termos_pesquisa', caminho_termos_pesquisa, **OPCOES_LEITURA_TEXTO)
+        with medir('limpeza:palavras_chave', linhas=len(palavras_chave)):
+            palavras_chave = limpar_palavras_chave(palavras_chave)
+        with medir('limpeza:pesquisas', linhas=len(pesquisas)):
+            pesquisas = limpar_pesquisas(pesquisas)
+        with medir('limpeza:termos_pesquisa', linhas=len(termos_pesquisa)):
+            termos_pesquisa = limpar_termos_pesquisa(termos_pesquisa)
+        with medir('compactacao_textos', linhas=len(palavras_chave) + len(pesquisas) + len(termos_pesquisa)):
+            palavras_chave = compactar_textos(palavras_chave)
+            pesquisas = compactar_textos(pesquisas)
+            termos_pesquisa = compactar_textos(termos_pesquisa)
+        with medir('resumo:palavras_chave', linhas=len(palavras_chave)):
+            resumo_palavras_chave = resumir_palavras_chave([palavras_chave])
+        with medir('resumo:pesquisas', linhas=len(pesquisas)):
+            resumo_pesquisas = resumir_pesquisas([pesquisas])
+        with medir('resumo:termos_pesquisa', linhas=len(termos_pesquisa)):
+            resumo_termos_pesquisa = resumir_termos_pesquisa([termos_pesquisa])
+        tabelas_completas = {'palavras_chave': palavras_chave, 'pesquisas': pesquisas, 'termos_pesquisa': termos_pesquisa}
     
     # Série temporal (Recriando um DataFrame simples para não quebrar o código)
     # Usando os dados de Cliques e Custo da tabela de Campanhas para criar uma "semana" única de resumo.
@@ -156,28 +755,29 @@ def load_data():
     })
     
     # Dia e hora
-    dia_hora['Impressões_num'] = dia_hora['Impressões'].apply(clean_number)
-    hora['Impressões_num'] = hora['Impressões'].apply(clean_number)
-    dia_hora_detalhado['Impressões_num'] = dia_hora_detalhado['Impressões'].apply(clean_number)
-    
-    # Limpar dados demográficos
-    idade['Impressões_num'] = idade['Impressões'].apply(clean_number)
-    idade['Porcentagem_num'] = idade['Porcentagem do total conhecido'].apply(clean_percentage)
-    
-    sexo['Impressões_num'] = sexo['Impressões'].apply(clean_number)
-    sexo['Porcentagem_num'] = sexo['Porcentagem do total conhecido'].apply(clean_percentage)
-    
-    sexo_idade['Impressões_num'] = sexo_idade['Impressões'].apply(clean_number)
-    sexo_idade['Porcentagem_num'] = sexo_idade['Porcentagem do total conhecido'].apply(clean_percentage)
+    with medir('limpeza:dia_hora', linhas=len(dia_hora) + len(hora) + len(dia_hora_detalhado)):
+        dia_hora['Impressões_num'] = dia_hora['Impressões'].apply(clean_number)
+        # Ordem dos dias da semana
+        dia_hora['Dia'] = pd.Categorical(dia_hora['Dia'], categories=ORDEM_DIAS, ordered=True)
+        hora['Impressões_num'] = hora['Impressões'].apply(clean_number)
+        dia_hora_detalhado['Impressões_num'] = dia_hora_detalhado['Impressões'].apply(clean_number)
+        # Hora de início ("00" a "23") volta a ser número para o eixo dos gráficos
+        hora['Hora de início'] = pd.to_numeric(hora['Hora de início'])
+        dia_hora_detalhado['Hora de início'] = pd.to_numeric(dia_hora_detalhado['Hora de início'])
+    
+    # Cubo demográfico e conferência com os relatórios agregados
+    with medir('cubo_demografico', linhas=len(sexo_idade)):
+        demografia = montar_cubo_demografico(sexo_idade)
+        demografia['conferencia'] = conferir_cubo(demografia, {'faixa': idade, 'sexo': sexo})
     
     return {
         'campanhas': campanhas,
         'dispositivos': dispositivos,
-        'idade': idade,
-        'sexo': sexo,
-        'sexo_idade': sexo_idade,
-        'palavras_chave': palavras_chave,
-        'pesquisas': pesquisas,
+        'demografia': demografia,
+        'resumo_palavras_chave': resumo_palavras_chave,
+        'resumo_pesquisas': resumo_pesquisas,
+        'resumo_termos_pesquisa': resumo_termos_pesquisa,
+        **tabelas_completas, # 'palavras_chave', 'pesquisas' e 'termos_pesquisa' (ausentes na leitura em blocos)
         'serie_temporal': serie_temporal, # SIMULADO
         'redes': redes, # SIMULADO
         'dia_hora': dia_hora,
@@ -185,12 +785,771 @@ def load_data():
         'dia_hora_detalhado': dia_hora_detalhado
     }
 
-data = load_data()
+# --- Cubo demográfico ---
+# Impressões por sexo x faixa etária x campanha x período num array denso, montado uma vez a
+# partir do relatório mais detalhado (Sexo_Idade). Totais por idade, por sexo e a
+# "Porcentagem do total conhecido" saem de somas sobre os eixos, em O(células) para qualquer
+# recorte. Eixos ausentes no relatório têm um único rótulo ("Todas").
+EIXOS_DEMOGRAFICOS = {
+    'sexo': 'Sexo',
+    'faixa': 'Faixa de idade',
+    'campanha': 'Nome da campanha',
+    'periodo': 'Período',
+}
+ROTULO_TODOS = 'Todas'
+DIVERGENCIA_MAXIMA_PCT = 2.0  # diferença tolerada entre o cubo e os relatórios por idade/sexo
+
+def montar_cubo_demografico(sexo_idade):
+    impressoes = sexo_idade['Impressões'].apply(clean_number).to_numpy(dtype=float)
+    eixos = {}
+    codigos = []
+    for eixo, coluna in EIXOS_DEMOGRAFICOS.items():
+        if coluna in sexo_idade.columns:
+            codigo, rotulos = pd.factorize(sexo_idade[coluna], sort=False)
+            eixos[eixo] = list(rotulos)
+        else:
+            codigo = np.zeros(len(sexo_idade), dtype=np.intp)
+            eixos[eixo] = [ROTULO_TODOS]
+        codigos.append(codigo)
+
+    # Linhas sem algum rótulo (código -1) ficam de fora
+    completas = np.all(np.column_stack(codigos) >= 0, axis=1) if codigos else np.ones(0, dtype=bool)
+    valores = np.zeros([len(rotulos) for rotulos in eixos.values()])
+    np.add.at(valores, tuple(codigo[completas] for codigo in codigos), impressoes[completas])
+    return {'eixos': eixos, 'valores': valores}
+
+# Soma o cubo mantendo os eixos de `manter`, opcionalmente restrito aos rótulos de `filtros`.
+# Devolve uma tabela longa com Impressões_num e Porcentagem_num (sobre o total do recorte).
+def agregar_cubo(cubo, manter, filtros=None):
+    nomes = list(cubo['eixos'])
+    indices = []
+    for eixo in nomes:
+        rotulos = cubo['eixos'][eixo]
+        selecionados = (filtros or {}).get(eixo)
+        if selecionados:
+            indices.append(np.array([i for i, rotulo in enumerate(rotulos) if rotulo in selecionados], dtype=np.intp))
+        else:
+            indices.append(np.arange(len(rotulos)))
+
+    fatia = cubo['valores'][np.ix_(*indices)]
+    reduzido = fatia.sum(axis=tuple(i for i, eixo in enumerate(nomes) if eixo not in manter))
+    total = fatia.sum()
+
+    mantidos = [eixo for eixo in nomes if eixo in manter]
+    indice = pd.MultiIndex.from_product(
+        [[cubo['eixos'][eixo][i] for i in indices[nomes.index(eixo)]] for eixo in mantidos],
+        names=[EIXOS_DEMOGRAFICOS[eixo] for eixo in mantidos])
+    tabela = pd.DataFrame({'Impressões_num': np.ravel(reduzido)}, index=indice).reset_index()
+    tabela['Porcentagem_num'] = tabela['Impressões_num'] / total * 100 if total > 0 else 0.0
+    return tabela
+
+# Compara os totais do cubo com os relatórios mais agregados (por idade, por sexo).
+# O Google Ads omite células pequenas, então pequenas diferenças são esperadas.
+def conferir_cubo(cubo, relatorios):
+    conferencia = []
+    for eixo, relatorio in relatorios.items():
+        coluna = EIXOS_DEMOGRAFICOS[eixo]
+        esperado = relatorio['Impressões'].apply(clean_number).groupby(relatorio[coluna], sort=False).sum()
+        obtido = agregar_cubo(cubo, [eixo]).set_index(coluna)['Impressões_num']
+        comparacao = pd.concat({'relatorio': esperado, 'cubo': obtido}, axis=1).fillna(0)
+        for rotulo, linha in comparacao.iterrows():
+            diferenca_pct = (linha['cubo'] - linha['relatorio']) / linha['relatorio'] * 100 if linha['relatorio'] else 100.0
+            conferencia.append({
+                'Eixo': coluna,
+                'Rótulo': rotulo,
+                'Relatório': linha['relatorio'],
+                'Cubo': linha['cubo'],
+                'Diferença (%)': diferenca_pct,
+            })
+    return pd.DataFrame(conferencia, columns=['Eixo', 'Rótulo', 'Relatório', 'Cubo', 'Diferença (%)'])
+
+# --- Exportação dos dados filtrados ---
+# Os arquivos só são gerados quando o usuário clica no botão (o Streamlit executa a função
+# em outra thread). As linhas são filtradas e gravadas bloco a bloco num arquivo temporário,
+# sem montar uma cópia filtrada da tabela inteira. Na leitura em blocos o relatório é relido.
+# O Streamlit, porém, lê o arquivo pronto inteiro para a memória do servidor antes de
+# servi-lo: acima de LIMITE_LINHAS_EXPORTACAO linhas a exportação não é oferecida.
+LIMITE_LINHAS_EXPORTACAO = int(os.environ.get('DASHBOARD_LIMITE_EXPORTACAO', '500000'))
+LIMITE_LINHAS_XLSX = 1_048_575  # linhas de dados por planilha (o Excel aceita 1.048.576 com o cabeçalho)
+LIMPEZA_TABELAS = {'palavras_chave': limpar_palavras_chave, 'pesquisas': limpar_pesquisas,
+                   'termos_pesquisa': limpar_termos_pesquisa}
+
+# Gerador de blocos já filtrados de uma tabela da conta
+def blocos_filtrados(dados, pasta, tabela, filtro=None):
+    if tabela in dados:
+        df = dados[tabela]
+        for inicio in range(0, len(df), TAMANHO_BLOCO):
+            bloco = df.iloc[inicio:inicio + TAMANHO_BLOCO]
+            yield bloco if filtro is None else bloco[filtro(bloco)]
+    else:
+        caminho = os.path.join(pasta, ARQUIVOS[tabela])
+        for bloco in ler_blocos(f'exportacao:{tabela}', caminho, LIMPEZA_TABELAS[tabela]):
+            yield bloco if filtro is None else bloco[filtro(bloco)]
+
+def escrever_csv(blocos, arquivo):
+    # utf-8-sig para o Excel reconhecer os acentos
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    cabecalho = True
+    for bloco in blocos:
+        if bloco.empty and not cabecalho:
+            continue
+        bloco.to_csv(texto, index=False, header=cabecalho)
+        cabecalho = False
+    texto.flush()
+    texto.detach()
+
+def escrever_parquet(blocos, arquivo):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    ultimo_vazio = None
+    for bloco in blocos:
+        # Blocos vazios não definem o esquema (colunas de texto vazias viram tipo nulo)
+        if bloco.empty:
+            ultimo_vazio = bloco
+            continue
+        if escritor is None:
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            escritor = pq.ParquetWriter(arquivo, tabela.schema)
+        else:
+            tabela = pa.Table.from_pandas(bloco, schema=escritor.schema, preserve_index=False)
+        escritor.write_table(tabela)
+    if escritor is None and ultimo_vazio is not None:
+        pq.write_table(pa.Table.from_pandas(ultimo_vazio, preserve_index=False), arquivo)
+    elif escritor is not None:
+        escritor.close()
+
+def escrever_xlsx(blocos, arquivo):
+    from openpyxl import Workbook
+
+    # write_only grava as linhas em disco conforme chegam
+    livro = Workbook(write_only=True)
+    planilha = None
+    linhas_planilha = 0
+    for bloco in blocos:
+        if planilha is None:
+            planilha = livro.create_sheet('Dados')
+            planilha.append(list(bloco.columns))
+        # NaN não é um valor válido no Excel
+        bloco = bloco.astype(object).where(bloco.notna(), None)
+        for linha in bloco.itertuples(index=False, name=None):
+            if linhas_planilha == LIMITE_LINHAS_XLSX:
+                planilha = livro.create_sheet(f'Dados {len(livro.worksheets) + 1}')
+                planilha.append(list(bloco.columns))
+                linhas_planilha = 0
+            planilha.append(linha)
+            linhas_planilha += 1
+    if planilha is None:
+        livro.create_sheet('Dados')
+    livro.save(arquivo)
+
+FORMATOS_EXPORTACAO = {
+    'CSV': ('csv', 'text/csv', escrever_csv),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet', escrever_parquet),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', escrever_xlsx),
+}
+if importlib.util.find_spec('pyarrow') is None:
+    del FORMATOS_EXPORTACAO['Parquet']
+if importlib.util.find_spec('openpyxl') is None:
+    del FORMATOS_EXPORTACAO['XLSX']
+
+# A lista de consultas volta ao formato do relatório, como na leitura em blocos. Vale para
+# toda exportação: tabelas resumidas (top_cliques) também carregam a coluna compacta.
+def blocos_com_consultas_em_texto(blocos):
+    for bloco in blocos:
+        if COLUNA_CONSULTAS in bloco.columns and not pd.api.types.is_string_dtype(bloco[COLUNA_CONSULTAS].dtype):
+            bloco = bloco.assign(**{COLUNA_CONSULTAS: texto_consultas(bloco[COLUNA_CONSULTAS])})
+        yield bloco
+
+# Chamado no clique: grava os blocos num arquivo temporário e o devolve para download
+def gerar_exportacao(gerar_blocos, escrever, etapa):
+    with medir(f'exportacao:{etapa}'):
+        arquivo = tempfile.TemporaryFile()
+        escrever(blocos_com_consultas_em_texto(gerar_blocos()), arquivo)
+        arquivo.seek(0)
+    return arquivo
+
+# Botões de download (um por formato) para as linhas por trás de um gráfico ou tabela.
+# `gerar_blocos` é uma função sem argumentos que devolve os blocos já filtrados;
+# `linhas`, quando conhecido, é o total de linhas exportadas.
+def botoes_exportacao(nome, gerar_blocos, linhas=None):
+    with st.popover("⬇️ Exportar dados"):
+        if linhas is not None and linhas > LIMITE_LINHAS_EXPORTACAO:
+            st.warning(f"Exportação muito grande ({linhas:,} linhas; limite de "
+                       f"{LIMITE_LINHAS_EXPORTACAO:,}). Use o relatório original do Google Ads.")
+            return
+        for formato, (extensao, mime, escrever) in FORMATOS_EXPORTACAO.items():
+            st.download_button(formato,
+                               data=partial(gerar_exportacao, gerar_blocos, escrever, f'{nome}.{extensao}'),
+                               file_name=f"{nome}.{extensao}",
+                               mime=mime,
+                               key=f"exportar_{nome}_{extensao}",
+                               on_click='ignore')
+
+# Exportação de um DataFrame pequeno (já agregado) como bloco único
+def botoes_exportacao_tabela(nome, df):
+    botoes_exportacao(nome, lambda: iter([df]), len(df))
+
+# --- Benchmarks entre contas ---
+# CTR, CPC, taxa de conversão e custo por conversão de todas as contas disponíveis viram uma
+# matriz (contas x métricas) e os percentis de cada conta entre as demais saem de ordenações
+# NumPy por coluna. Os totais de cada conta ficam em cache pela assinatura dos seus arquivos;
+# o resultado, pela versão do conjunto de contas. A comparação é só entre contas, no período
+# principal (ARQUIVOS); os demais períodos da aba de comparação não entram na distribuição.
+# (chave, rótulo, maior é melhor)
+METRICAS_BENCHMARK = [
+    ('ctr', 'CTR', True),
+    ('cpc', 'CPC (R$)', False),
+    ('taxa_conversao', 'Taxa de Conversão (Lead)', True),
+    ('custo_por_conversao', 'Custo/Conversão (R$)', False),
+]
+MIN_CONTAS_BENCHMARK = 3
+
+# Referência fixa (Imobiliário de Luxo/Nicho), usada quando há poucas contas para comparar
+REFERENCIA_SETOR = {'ctr': 1.5, 'cpc': 2.50, 'taxa_conversao': 1.5, 'custo_por_conversao': 100.00}
+TOP_PERFORMERS_SETOR = {'ctr': 3.0, 'cpc': 1.50, 'taxa_conversao': 4.0, 'custo_por_conversao': float('nan')}
+
+# Totais de uma conta com as mesmas leituras e regras de limpeza do dashboard
+def totais_conta(pasta):
+    campanhas = pd.read_csv(os.path.join(pasta, ARQUIVOS['campanhas']), usecols=['Custo', 'Cliques'], **OPCOES_LEITURA_TEXTO)
+    dia_hora = pd.read_csv(os.path.join(pasta, ARQUIVOS['dia_hora']), usecols=['Impressões'], **OPCOES_LEITURA_TEXTO)
+    conversoes = SomaExata()
+    for bloco in pd.read_csv(os.path.join(pasta, ARQUIVOS['pesquisas']), usecols=['Conversões'],
+                             chunksize=TAMANHO_BLOCO, **OPCOES_LEITURA_TEXTO):
+        conversoes.adicionar(bloco['Conversões'].apply(clean_number).tolist())
+    return (
+        dia_hora['Impressões'].apply(clean_number).sum(),
+        campanhas['Cliques'].apply(clean_number).sum(),
+        campanhas['Custo'].apply(clean_currency_value).sum(),
+        conversoes.valor(),
+    )
+
+# Totais por pasta, com a assinatura dos arquivos de que vieram: um relatório trocado substitui
+# a entrada e contas que saíram do diretório são removidas
+@st.cache_resource
+def _cache_totais_contas():
+    return {'lock': threading.Lock(), 'entradas': {}}  # pasta -> (assinatura, totais)
+
+# versao_contas faz um os.stat por relatório de cada conta: relida no máximo a cada minuto,
+# não a cada rerun
+@st.cache_data(ttl=60, show_spinner=False)
+def versao_contas_recente():
+    return versao_contas()
+
+# Percentil de cada conta entre as demais (0 = pior, 100 = melhor), ignorando valores ausentes
+def percentis_entre_pares(valores, maior_melhor):
+    percentis = np.full(valores.shape, np.nan)
+    for j in range(valores.shape[1]):
+        coluna = valores[:, j]
+        validos = ~np.isnan(coluna)
+        ordenados = np.sort(coluna[validos])
+        if len(ordenados) < 2:
+            continue
+        abaixo = np.searchsorted(ordenados, coluna[validos], side='left')
+        iguais = np.searchsorted(ordenados, coluna[validos], side='right') - abaixo
+        # Empates contam meio a meio; a própria conta não é par de si mesma
+        percentil = (abaixo + (iguais - 1) / 2) / (len(ordenados) - 1) * 100
+        percentis[validos, j] = percentil if maior_melhor[j] else 100 - percentil
+    return percentis
+
+@st.cache_data(show_spinner=False)
+def calcular_benchmarks(versao):
+    with medir('benchmarks', linhas=len(versao)):
+        cache = _cache_totais_contas()
+        with cache['lock']:
+            guardados = [cache['entradas'].get(pasta) for _, pasta, _ in versao]
+        totais = [guardado[1] if guardado is not None and guardado[0] == assinatura else None
+                  for guardado, (_, _, assinatura) in zip(guardados, versao)]
+        pendentes = [(i, pasta, assinatura) for i, (_, pasta, assinatura) in enumerate(versao) if totais[i] is None]
+        if pendentes:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                for (i, _, _), lidos in zip(pendentes, executor.map(lambda chave: totais_conta(chave[1]), pendentes)):
+                    totais[i] = lidos
+        with cache['lock']:
+            for i, pasta, assinatura in pendentes:
+                cache['entradas'][pasta] = (assinatura, totais[i])
+            for pasta in set(cache['entradas']) - {pasta for _, pasta, _ in versao}:
+                del cache['entradas'][pasta]
+
+        impressoes, cliques, custo, conversoes = np.array(totais, dtype=float).reshape(-1, 4).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valores = np.column_stack([
+                np.where(impressoes > 0, cliques / impressoes * 100, np.nan),
+                np.where(cliques > 0, custo / cliques, np.nan),
+                np.where(cliques > 0, conversoes / cliques * 100, np.nan),
+                np.where(conversoes > 0, custo / conversoes, np.nan),
+            ])
+
+        maior_melhor = np.array([maior for _, _, maior in METRICAS_BENCHMARK])
+        validos = (~np.isnan(valores)).sum(axis=0)
+        mediana = np.full(len(METRICAS_BENCHMARK), np.nan)
+        quartil_superior = np.full(len(METRICAS_BENCHMARK), np.nan)
+        for j, quantidade in enumerate(validos):
+            if quantidade:
+                coluna = valores[:, j]
+                mediana[j] = np.nanmedian(coluna)
+                # "Top performers": quartil superior (ou inferior, para custos)
+                quartil_superior[j] = np.nanpercentile(coluna, 75 if maior_melhor[j] else 25)
+
+    return {
+        'contas': [conta for conta, _, _ in versao],
+        'valores': valores,
+        'percentis': percentis_entre_pares(valores, maior_melhor),
+        'mediana': mediana,
+        'quartil_superior': quartil_superior,
+        'validos': validos,
+    }
+
+# --- Comparação entre períodos ---
+# Cada intervalo de datas exportado na pasta da conta é um período: Campanhas(<início>-<fim>).csv
+# e os demais relatórios com o mesmo intervalo no nome. Por dimensão (KPIs, campanha,
+# palavra-chave, dispositivo, público) os totais de todos os períodos viram uma matriz alinhada
+# (chaves x períodos) guardada como soma acumulada ao longo dos períodos: o total de qualquer
+# janela é a diferença entre duas colunas, e a tabela de variações de um par de janelas custa
+# O(chaves), mesmo com anos de períodos semanais. Os totais de cada período ficam em cache pela
+# assinatura dos seus arquivos, então um período novo só lê os próprios relatórios. O cache
+# guarda uma entrada por período (a troca de um relatório substitui a anterior) e despeja os
+# menos usados acima de DASHBOARD_ORCAMENTO_PERIODOS_MB.
+ORCAMENTO_PERIODOS_MB = float(os.environ.get('DASHBOARD_ORCAMENTO_PERIODOS_MB', '256'))
+PADRAO_PERIODO = re.compile(r'\d{4}\.\d{2}\.\d{2}-\d{4}\.\d{2}\.\d{2}')
+PERIODO_PADRAO = PADRAO_PERIODO.search(ARQUIVOS['campanhas']).group()
+
+# (rótulo, relatório, colunas que formam a chave, [(métrica, limpeza)])
+DIMENSOES_PERIODO = {
+    'campanha': ('Campanha', 'campanhas', ['Nome da campanha'],
+                 [('Custo', clean_currency_value), ('Cliques', clean_number)]),
+    'palavra_chave': ('Palavra-chave', 'palavras_chave', [COLUNA_PALAVRA_CHAVE],
+                      [('Custo', clean_currency_value), ('Cliques', clean_number)]),
+    'dispositivo': ('Dispositivo', 'dispositivos', ['Dispositivo'],
+                    [('Impressões', clean_number), ('Cliques', clean_number), ('Custo', clean_currency_value)]),
+    'publico': ('Público', 'sexo_idade', ['Sexo', 'Faixa de idade'],
+                [('Impressões', clean_number)]),
+}
+# KPIs da conta, com as mesmas fontes da sidebar (impressões do Dia_e_hora, conversões das Pesquisas)
+METRICAS_KPI_PERIODO = ['Impressões', 'Cliques', 'Custo', 'Conversões']
+RELATORIOS_PERIODO = sorted({tabela for _, tabela, _, _ in DIMENSOES_PERIODO.values()} | {'dia_hora', 'pesquisas'})
+
+# Nome de um relatório em outro período (mesmo prefixo, outro intervalo de datas)
+def arquivo_periodo(tabela, periodo):
+    return PADRAO_PERIODO.sub(periodo, ARQUIVOS[tabela], count=1)
+
+# Períodos exportados na pasta, do mais antigo ao mais recente
+def listar_periodos(pasta='.'):
+    prefixo, sufixo = ARQUIVOS['campanhas'].split(PERIODO_PADRAO)
+    periodos = []
+    for nome in os.listdir(pasta):
+        if nome.startswith(prefixo) and nome.endswith(sufixo):
+            periodo = nome[len(prefixo):len(nome) - len(sufixo)]
+            if PADRAO_PERIODO.fullmatch(periodo):
+                periodos.append(periodo)
+    # AAAA.MM.DD ordena como data; períodos que começam juntos, pelo fim
+    return sorted(periodos)
+
+def rotulo_periodo(periodo):
+    inicio, fim = (datetime.strptime(data, '%Y.%m.%d').strftime('%d/%m/%Y') for data in periodo.split('-'))
+    return f"{inicio} a {fim}"
+
+# Janela = (primeiro período, último período + 1)
+def rotulo_janela(periodos, janela):
+    inicio, fim = janela
+    if fim - inicio == 1:
+        return rotulo_periodo(periodos[inicio])
+    return f"{rotulo_periodo(periodos[inicio]).split(' a ')[0]} a {rotulo_periodo(periodos[fim - 1]).split(' a ')[1]} ({fim - inicio} períodos)"
+
+def assinatura_periodo(pasta, periodo):
+    assinatura = []
+    for tabela in RELATORIOS_PERIODO:
+        try:
+            info = os.stat(os.path.join(pasta, arquivo_periodo(tabela, periodo)))
+            assinatura.append([tabela, info.st_size, info.st_mtime_ns])
+        except OSError:
+            assinatura.append([tabela, None, None])
+    return assinatura
+
+# Versão dos períodos da pasta: muda quando um período aparece ou um relatório é trocado
+def versao_periodos(pasta):
+    return tuple((periodo, json.dumps(assinatura_periodo(pasta, periodo))) for periodo in listar_periodos(pasta))
+
+# Soma de uma coluna de um relatório do período (None se o relatório não existe)
+def somar_relatorio(pasta, tabela, periodo, coluna, limpar):
+    caminho = os.path.join(pasta, arquivo_periodo(tabela, periodo))
+    if not os.path.exists(caminho):
+        return None
+    soma = SomaExata()
+    for bloco in pd.read_csv(caminho, usecols=[coluna], chunksize=TAMANHO_BLOCO, **OPCOES_LEITURA_TEXTO):
+        soma.adicionar(bloco[coluna].apply(limpar).tolist())
+    return soma.valor()
+
+# Totais de um período por dimensão (DataFrame indexado pela chave) e relatórios ausentes
+def totais_periodo(pasta, periodo):
+    tabelas = {}
+    faltando = []
+    for dimensao, (_, tabela, chaves, metricas) in DIMENSOES_PERIODO.items():
+        caminho = os.path.join(pasta, arquivo_periodo(tabela, periodo))
+        if not os.path.exists(caminho):
+            tabelas[dimensao] = None
+            faltando.append(tabela)
+            continue
+        partes = []
+        colunas = chaves + [metrica for metrica, _ in metricas]
+        for bloco in pd.read_csv(caminho, usecols=colunas, chunksize=TAMANHO_BLOCO, **OPCOES_LEITURA_TEXTO):
+            valores = pd.DataFrame({metrica: bloco[metrica].apply(limpar) for metrica, limpar in metricas})
+            chave = bloco[chaves[0]].fillna('')
+            for coluna in chaves[1:]:
+                chave = chave + ' · ' + bloco[coluna].fillna('')
+            valores.index = chave
+            partes.append(valores.groupby(level=0, sort=False).sum())
+        tabelas[dimensao] = pd.concat(partes).groupby(level=0, sort=False).sum()
+
+    impressoes = somar_relatorio(pasta, 'dia_hora', periodo, 'Impressões', clean_number)
+    conversoes = somar_relatorio(pasta, 'pesquisas', periodo, 'Conversões', clean_number)
+    faltando += [tabela for tabela, valor in [('dia_hora', impressoes), ('pesquisas', conversoes)] if valor is None]
+    campanhas = tabelas['campanha']
+    tabelas['kpis'] = pd.DataFrame({
+        'Impressões': [impressoes or 0.0],
+        'Cliques': [0.0 if campanhas is None else campanhas['Cliques'].sum()],
+        'Custo': [0.0 if campanhas is None else campanhas['Custo'].sum()],
+        'Conversões': [conversoes or 0.0],
+    }, index=['Total'])
+    return tabelas, faltando
+
+# Totais por (pasta, período) em ordem LRU, com a assinatura dos arquivos de que vieram
+class CacheTotaisPeriodos:
+    def __init__(self, orcamento_bytes):
+        self.orcamento_bytes = orcamento_bytes
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # (pasta, periodo) -> (assinatura, totais, bytes)
+        self._total_bytes = 0
+
+    def obter(self, pasta, periodo, assinatura):
+        with self._lock:
+            entrada = self._entradas.get((pasta, periodo))
+            if entrada is None or entrada[0] != assinatura:
+                return None
+            self._entradas.move_to_end((pasta, periodo))
+            return entrada[1]
+
+    def guardar(self, pasta, periodo, assinatura, totais):
+        tamanho = tamanho_dados(totais[0])
+        with self._lock:
+            anterior = self._entradas.pop((pasta, periodo), None)
+            if anterior is not None:
+                self._total_bytes -= anterior[2]
+            self._entradas[(pasta, periodo)] = (assinatura, totais, tamanho)
+            self._total_bytes += tamanho
+            # A entrada recém-guardada fica mesmo sozinha acima do orçamento
+            while self._total_bytes > self.orcamento_bytes and len(self._entradas) > 1:
+                _, (_, _, tamanho_removido) = self._entradas.popitem(last=False)
+                self._total_bytes -= tamanho_removido
+
+@st.cache_resource
+def _cache_totais_periodos():
+    return CacheTotaisPeriodos(ORCAMENTO_PERIODOS_MB * 1024 ** 2)
+
+# Matrizes alinhadas (chaves x períodos) de cada dimensão, acumuladas ao longo dos períodos.
+# cache_resource: as matrizes são lidas sem cópia a cada rerun
+@st.cache_resource(max_entries=16, show_spinner=False)
+def montar_paineis_periodos(pasta, versao):
+    with medir('paineis_periodos', linhas=len(versao)):
+        cache = _cache_totais_periodos()
+        # Os totais ficam nesta lista: o cache pode despejar um período antes do fim da montagem
+        totais = [cache.obter(pasta, periodo, assinatura) for periodo, assinatura in versao]
+        pendentes = [(i, periodo, assinatura) for i, (periodo, assinatura) in enumerate(versao) if totais[i] is None]
+        if pendentes:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                for (i, periodo, assinatura), lidos in zip(pendentes, executor.map(lambda chave: totais_periodo(pasta, chave[1]), pendentes)):
+                    totais[i] = lidos
+                    cache.guardar(pasta, periodo, assinatura, lidos)
+
+        periodos = [periodo for periodo, _ in versao]
+        dimensoes = {dimensao: [metrica for metrica, _ in metricas] for dimensao, (_, _, _, metricas) in DIMENSOES_PERIODO.items()}
+        dimensoes['kpis'] = METRICAS_KPI_PERIODO
+
+        paineis = {}
+        for dimensao, metricas in dimensoes.items():
+            tabelas = [tabelas_periodo[dimensao] for tabelas_periodo, _ in totais]
+            presentes = [tabela.index.to_series() for tabela in tabelas if tabela is not None]
+            chaves = pd.Index(pd.concat(presentes).unique() if presentes else [])
+            # Coluna 0 zerada: o total da janela (i, j) é acumulado[:, j] - acumulado[:, i]
+            acumulado = {metrica: np.zeros((len(chaves), len(periodos) + 1)) for metrica in metricas}
+            for j, tabela in enumerate(tabelas):
+                if tabela is None:
+                    continue
+                linhas = chaves.get_indexer(tabela.index)
+                for metrica in metricas:
+                    acumulado[metrica][linhas, j + 1] = tabela[metrica].to_numpy()
+            for matriz in acumulado.values():
+                np.cumsum(matriz, axis=1, out=matriz)
+            paineis[dimensao] = {'chaves': chaves, 'acumulado': acumulado}
+
+    return {
+        'periodos': periodos,
+        'faltando': {periodo: faltando for periodo, (_, faltando) in zip(periodos, totais) if faltando},
+        'paineis': paineis,
+    }
+
+# Tabela de variações alinhada pela chave da dimensão entre duas janelas de períodos
+@st.cache_data(max_entries=64, show_spinner=False)
+def comparar_periodos(pasta, versao, dimensao, base, atual):
+    painel = montar_paineis_periodos(pasta, versao)['paineis'][dimensao]
+    rotulo = 'Indicador' if dimensao == 'kpis' else DIMENSOES_PERIODO[dimensao][0]
+    colunas = {rotulo: painel['chaves']}
+    ativas = np.zeros(len(painel['chaves']), dtype=bool)
+    for metrica, acumulado in painel['acumulado'].items():
+        # Os relatórios têm no máximo 2 casas (centavos): arredondar tira o resíduo de ponto
+        # flutuante das diferenças de somas acumuladas (ex.: Δ -9e-13 entre janelas iguais)
+        valor_base = np.round(acumulado[:, base[1]] - acumulado[:, base[0]], 2)
+        valor_atual = np.round(acumulado[:, atual[1]] - acumulado[:, atual[0]], 2)
+        delta = np.round(valor_atual - valor_base, 2)
+        colunas[f'{metrica} (base)'] = valor_base
+        colunas[f'{metrica} (atual)'] = valor_atual
+        colunas[f'Δ {metrica}'] = delta
+        with np.errstate(divide='ignore', invalid='ignore'):
+            colunas[f'Δ {metrica} (%)'] = np.where(valor_base != 0, delta / np.abs(valor_base) * 100, np.nan)
+        ativas |= (valor_base != 0) | (valor_atual != 0)
+    tabela = pd.DataFrame(colunas)
+    if dimensao != 'kpis':
+        # Só chaves com movimento em alguma das janelas, maiores variações primeiro
+        principal = f'Δ {next(iter(painel["acumulado"]))}'
+        tabela = tabela[ativas].sort_values(principal, key=np.abs, ascending=False, kind='stable')
+    return tabela.reset_index(drop=True)
+
+# --- Dados compartilhados entre sessões ---
+# Um único GerenciadorDados por processo guarda uma cópia (somente leitura) dos dados limpos
+# de cada conta. Sessões adquirem uma referência à conta aberta; contas sem referências são
+# despejadas em ordem LRU quando o total passa do orçamento de memória.
+# As contas (listar_contas) vêm de relatorios.py, a mesma definição usada pelo exportador estático.
+ORCAMENTO_MEMORIA_MB = float(os.environ.get('DASHBOARD_ORCAMENTO_MB', '1024'))
+
+# Memória ocupada pelos DataFrames de uma conta (inclusive os guardados nos resumos)
+def tamanho_dados(dados):
+    total = 0
+    for valor in dados.values():
+        if isinstance(valor, pd.DataFrame):
+            total += valor.memory_usage(deep=True).sum()
+        elif isinstance(valor, np.ndarray):
+            total += valor.nbytes
+        elif isinstance(valor, dict):
+            total += tamanho_dados(valor)
+    return int(total)
+
+class GerenciadorDados:
+    def __init__(self, carregar, orcamento_bytes):
+        self._carregar = carregar
+        self.orcamento_bytes = orcamento_bytes
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # conta -> {'dados', 'bytes', 'refs'}, da menos para a mais recente
+        self._carregando = {}  # conta -> threading.Event de quem está carregando
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def carregada(self, conta):
+        with self._lock:
+            return conta in self._entradas
+
+    # Devolve os dados da conta e soma uma referência
+    def adquirir(self, conta):
+        return self._obter(conta, 1)
+
+    # Devolve os dados da conta sem mexer nas referências (sessão que já tem a sua)
+    def obter(self, conta):
+        return self._obter(conta, 0)
+
+    def liberar(self, conta):
+        with self._lock:
+            entrada = self._entradas.get(conta)
+            if entrada is not None:
+                entrada['refs'] = max(entrada['refs'] - 1, 0)
+            self._despejar()
+
+    def _obter(self, conta, referencias):
+        while True:
+            with self._lock:
+                entrada = self._entradas.get(conta)
+                if entrada is not None:
+                    self._entradas.move_to_end(conta)
+                    entrada['refs'] += referencias
+                    self.acertos += 1
+                    return entrada['dados']
+                evento = self._carregando.get(conta)
+                if evento is None:
+                    # Esta sessão carrega; as demais esperam pelo mesmo resultado
+                    evento = self._carregando[conta] = threading.Event()
+                    self.faltas += 1
+                    break
+            evento.wait()
+
+        try:
+            dados = self._carregar(conta)
+            tamanho = tamanho_dados(dados)
+        except BaseException:
+            with self._lock:
+                del self._carregando[conta]
+            evento.set()
+            raise
+
+        # Entrada inserida e evento removido na mesma seção crítica: quem acordar já encontra
+        # a conta carregada (sem segunda carga nem referências perdidas)
+        with self._lock:
+            self._entradas[conta] = {'dados': dados, 'bytes': tamanho, 'refs': referencias}
+            del self._carregando[conta]
+            self._despejar()
+        evento.set()
+        return dados
+
+    # Remove contas sem referências (mais antigas primeiro) até caber no orçamento.
+    # Contas em uso nunca são removidas, então o orçamento pode ser excedido temporariamente.
+    def _despejar(self):
+        total = sum(entrada['bytes'] for entrada in self._entradas.values())
+        for conta, entrada in list(self._entradas.items())[:-1]:
+            if total <= self.orcamento_bytes:
+                break
+            if entrada['refs'] == 0:
+                del self._entradas[conta]
+                total -= entrada['bytes']
+                self.despejos += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'despejos': self.despejos,
+                'memoria_bytes': sum(entrada['bytes'] for entrada in self._entradas.values()),
+                'orcamento_bytes': self.orcamento_bytes,
+                'contas': {conta: {'bytes': entrada['bytes'], 'refs': entrada['refs']}
+                           for conta, entrada in self._entradas.items()},
+            }
+
+def _carregar_conta(conta):
+    return load_data(listar_contas()[conta])
+
+@st.cache_resource
+def _gerenciador_dados():
+    return GerenciadorDados(_carregar_conta, int(ORCAMENTO_MEMORIA_MB * 1024 ** 2))
+
+# Referência de uma sessão a uma conta. Guardada em st.session_state, é liberada quando a
+# sessão troca de conta ou quando o Streamlit descarta a sessão (coleta de lixo).
+class _ReferenciaConta:
+    def __init__(self, gerenciador, conta):
+        self.conta = conta
+        self._finalizador = weakref.finalize(self, gerenciador.liberar, conta)
+
+    def liberar(self):
+        self._finalizador()
+
+# Dados da conta para a sessão atual. O dicionário é uma cópia rasa: as abas podem
+# trocar entradas, mas não devem alterar os DataFrames compartilhados.
+def adquirir_dados(conta):
+    gerenciador = _gerenciador_dados()
+    referencia = st.session_state.get('_referencia_dados')
+    if referencia is not None and referencia.conta == conta:
+        return dict(gerenciador.obter(conta))
+    if referencia is not None:
+        referencia.liberar()
+    dados = gerenciador.adquirir(conta)
+    st.session_state['_referencia_dados'] = _ReferenciaConta(gerenciador, conta)
+    return dict(dados)
+
+# Conta escolhida pela URL (?conta=...); sem parâmetro, a primeira disponível
+contas_disponiveis = listar_contas()
+conta_atual = st.query_params.get('conta')
+if conta_atual not in contas_disponiveis:
+    conta_atual = next(iter(contas_disponiveis))
+pasta_conta = contas_disponiveis[conta_atual]
+
+# --- Modo de início rápido ---
+# Com DASHBOARD_INICIO_RAPIDO=1, um worker recém-iniciado primeiro desenha os KPIs da sidebar
+# e da primeira aba a partir de um snapshot JSON de poucos KB e só depois importa
+# pandas/numpy/plotly e carrega os dados completos. O carregamento continua no mesmo tempo
+# total; o ganho é a primeira pintura chegar antes dele.
+INICIO_RAPIDO = os.environ.get('DASHBOARD_INICIO_RAPIDO', '0') == '1'
+SNAPSHOT_ARQUIVO = os.environ.get('DASHBOARD_SNAPSHOT', 'snapshot_inicial.json')
+VERSAO_SNAPSHOT = 2  # 2: campanhas e dia/hora lidos como texto (milhares corretos)
+
+def ler_snapshot(pasta='.'):
+    caminho = os.path.join(pasta, SNAPSHOT_ARQUIVO)
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            snapshot = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('versao') != VERSAO_SNAPSHOT or snapshot.get('assinatura') != assinatura_fontes(pasta):
+        return None
+    return snapshot
+
+def salvar_snapshot(snapshot, pasta='.'):
+    gravar_arquivo_atomico(os.path.join(pasta, SNAPSHOT_ARQUIVO), json.dumps(snapshot, ensure_ascii=False))
+
+# Desenha a prévia (sem pandas/plotly) em placeholders que serão limpos após o carregamento
+def exibir_previa(snapshot, previa_sidebar, previa):
+    kpis = snapshot['kpis']
+
+    with previa_sidebar.container():
+        st.title("📊 Filtros")
+        st.markdown("---")
+        st.metric("Total de Impressões", f"{kpis['total_impressoes']:,.0f}")
+        st.metric("Total de Cliques", f"{kpis['total_cliques']:,.0f}")
+        st.metric("CTR Médio", f"{kpis['ctr_medio']:.2f}%")
+        st.metric("Custo Total", f"R$ {kpis['total_custo']:,.2f}")
+
+    with previa.container():
+        st.subheader("📊 Performance Geral da Campanha (Julho - Outubro 2025)")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Pontuação de Otimização", "86,2%")
+        with col2:
+            st.metric("Custo por Clique (CPC)", f"R$ {kpis['cpc_medio']:.2f}")
+        with col3:
+            st.metric("Conversões", f"{kpis['total_conversoes']:,.0f}")
+        with col4:
+            st.metric("CTR da Campanha", f"{kpis['ctr_medio']:.2f}%")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Período de Dados", "8 de Julho a 17 de Outubro")
+        with col2:
+            st.metric("Maior Impressão por Dia", f"{kpis['maior_impressao_dia']:.0f} ({kpis['dia_maior_impressao']})")
+        st.info("⏳ Carregando gráficos e demais abas...")
+
+previa_sidebar = previa = None
+conta_carregada = _gerenciador_dados().carregada(conta_atual)
+if INICIO_RAPIDO and not conta_carregada:
+    snapshot = ler_snapshot(pasta_conta)
+    if snapshot is not None:
+        previa_sidebar = st.sidebar.empty()
+        previa = st.empty()
+        exibir_previa(snapshot, previa_sidebar, previa)
+        if PERF_ATIVO:
+            registrar_etapa('primeira_pintura:snapshot', time.perf_counter() - INICIO_SCRIPT, None, 0)
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import numpy as np
+
+with medir('load_data'):
+    data = adquirir_dados(conta_atual)
+
+# Remove a prévia do início rápido antes de desenhar o dashboard completo
+if previa is not None:
+    previa_sidebar.empty()
+    previa.empty()
 
 # Sidebar
 st.sidebar.title("📊 Filtros")
 st.sidebar.markdown("---")
 
+# Seleção de conta (só aparece com mais de uma conta em DASHBOARD_CONTAS_DIR)
+if len(contas_disponiveis) > 1:
+    nomes_contas = list(contas_disponiveis)
+    conta_escolhida = st.sidebar.selectbox("Conta", nomes_contas, index=nomes_contas.index(conta_atual))
+    if conta_escolhida != conta_atual:
+        st.query_params['conta'] = conta_escolhida
+        st.rerun()
+
 # Métricas principais na sidebar
 total_impressoes = data['dia_hora']['Impressões_num'].sum()
 total_cliques = data['campanhas']['Cliques_num'].sum()
@@ -203,8 +1562,32 @@ st.sidebar.metric("Total de Cliques", f"{total_cliques:,.0f}")
 st.sidebar.metric("CTR Médio", f"{ctr_medio:.2f}%")
 st.sidebar.metric("Custo Total", f"R$ {total_custo:,.2f}")
 
+# Modo de comparação: só com mais de um período exportado na pasta da conta
+versao_periodos_conta = versao_periodos(pasta_conta)
+modo_comparacao = len(versao_periodos_conta) > 1 and st.sidebar.toggle(
+    "📅 Comparar períodos", help=f"{len(versao_periodos_conta)} períodos exportados nesta conta.")
+
+# Grava o snapshot da prévia quando ele não existe ou as exportações mudaram
+if INICIO_RAPIDO and not conta_carregada:
+    if ler_snapshot(pasta_conta) is None:
+        idx_maior_dia = data['dia_hora']['Impressões_num'].idxmax()
+        salvar_snapshot({
+            'versao': VERSAO_SNAPSHOT,
+            'assinatura': assinatura_fontes(pasta_conta),
+            'kpis': {
+                'total_impressoes': float(total_impressoes),
+                'total_cliques': float(total_cliques),
+                'total_custo': float(total_custo),
+                'ctr_medio': float(ctr_medio),
+                'cpc_medio': float(cpc_medio),
+                'total_conversoes': float(data['resumo_pesquisas']['conversoes']),
+                'maior_impressao_dia': float(data['dia_hora'].loc[idx_maior_dia, 'Impressões_num']),
+                'dia_maior_impressao': str(data['dia_hora'].loc[idx_maior_dia, 'Dia']),
+            },
+        }, pasta_conta)
+
 # Layout principal - ADICIONANDO A NOVA ABA DE COMPARATIVO
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
+nomes_abas = [
     "📈 Visão Geral", 
     "🎯 Público-Alvo", 
     "🔍 Palavras-chave", 
@@ -212,10 +1595,23 @@ tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
     "🔄 Conversões",
     "📊 Comparativo",
     "💡 Recomendações"
-])
+]
+
+if modo_comparacao:
+    nomes_abas.append("📅 Períodos")
+
+# Aba oculta de desempenho: só aparece com a instrumentação ligada e ?admin=1 na URL
+mostrar_aba_admin = PERF_ATIVO and st.query_params.get('admin') == '1'
+if mostrar_aba_admin:
+    nomes_abas.append("⏱️ Desempenho")
+
+abas = st.tabs(nomes_abas)
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = abas[:7]
+aba_periodos = abas[7] if modo_comparacao else None
+aba_desempenho = abas[-1] if mostrar_aba_admin else None
 
 # --- ABA 1: Visão Geral ---
-with tab1:
+with tab1, medir('aba:visao_geral'):
     # Período de Julho a Outubro de 2025
     st.subheader("📊 Performance Geral da Campanha (Julho - Outubro 2025)") 
     
@@ -234,7 +1630,7 @@ with tab1:
     
     with col3:
         # Conversões do seu arquivo são '0,00'
-        total_conversoes = data['pesquisas']['Conversões_num'].sum()
+        total_conversoes = data['resumo_pesquisas']['conversoes']
         st.markdown('<div class="metric-card negative-metric">', unsafe_allow_html=True)
         st.metric("Conversões", f"{total_conversoes:,.0f}")
         st.markdown('</div>', unsafe_allow_html=True)
@@ -257,7 +1653,7 @@ with tab1:
              # Add any other valid arguments here (e.g., title, color, labels)
             )
             fig.update_layout(xaxis_title='Período', yaxis_title='Cliques', xaxis_tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+            exibir_grafico(fig)
     
     with col2:
         # Custo "mensal" simulado
@@ -267,14 +1663,12 @@ with tab1:
                              color='Custo_num',
                              color_continuous_scale='reds')
             fig.update_layout(xaxis_title='Período', yaxis_title='Custo (R$)', xaxis_tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+            exibir_grafico(fig)
     
     # Gráficos de distribuição temporal
     col1, col2 = st.columns(2)
     
-    # Ordem dos dias da semana
-    ordem_dias = ['Domingo', 'Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado']
-    data['dia_hora']['Dia'] = pd.Categorical(data['dia_hora']['Dia'], categories=ordem_dias, ordered=True)
+    # Dias da semana já vêm ordenados (categoria) do carregamento
     df_dia_ordenado = data['dia_hora'].sort_values('Dia')
 
     with col1:
@@ -284,7 +1678,7 @@ with tab1:
                          color='Impressões_num',
                          color_continuous_scale='blues')
         fig.update_layout(xaxis_title='Hora', yaxis_title='Impressões')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
     
     with col2:
         # Impressões por dia da semana
@@ -292,7 +1686,7 @@ with tab1:
                          title='Impressões por Dia da Semana',
                          color='Impressões_num',
                          color_continuous_scale='greens')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
     
     # Análise de sazonalidade
     st.subheader("📈 Análise de Sazonalidade (SIMULADA)")
@@ -309,43 +1703,60 @@ with tab1:
         st.metric("Maior Impressão por Dia", f"{data['dia_hora']['Impressões_num'].max():.0f} ({data['dia_hora'].loc[data['dia_hora']['Impressões_num'].idxmax(), 'Dia']})")
         st.metric("Pico de Cliques (SIMULADO)", f"{semanas_ativas['Cliques_num'].max():.0f}")
 
+if PERF_ATIVO:
+    registrar_etapa('primeira_pintura:completa', time.perf_counter() - INICIO_SCRIPT, None, 0)
+
 # --- ABA 2: Público-Alvo ---
-with tab2:
+with tab2, medir('aba:publico_alvo'):
     st.subheader("🎯 Análise Demográfica Detalhada")
     
+    demografia = data['demografia']
+    
+    # Filtros por campanha/período (só quando o relatório traz esses eixos)
+    filtros_demografia = {}
+    for eixo in ['campanha', 'periodo']:
+        rotulos = demografia['eixos'][eixo]
+        if len(rotulos) > 1:
+            filtros_demografia[eixo] = st.multiselect(EIXOS_DEMOGRAFICOS[eixo], rotulos, key=f"filtro_demografia_{eixo}")
+    
+    # Recortes do cubo
+    df_idade = agregar_cubo(demografia, ['faixa'], filtros_demografia)
+    df_sexo = agregar_cubo(demografia, ['sexo'], filtros_demografia)
+    df_sexo_idade = agregar_cubo(demografia, ['sexo', 'faixa'], filtros_demografia)
+    
     # Cálculo das métricas demográficas para insights
-    maior_faixa = data['idade'].loc[data['idade']['Impressões_num'].idxmax()]
-    maior_sexo = data['sexo'].loc[data['sexo']['Impressões_num'].idxmax()]
+    maior_faixa = df_idade.loc[df_idade['Impressões_num'].idxmax()]
+    maior_sexo = df_sexo.loc[df_sexo['Impressões_num'].idxmax()]
     
     # Segmento mais engajado (maior número de impressões)
-    segmento_mais_engajado = data['sexo_idade'].loc[data['sexo_idade']['Impressões_num'].idxmax()]
+    segmento_mais_engajado = df_sexo_idade.loc[df_sexo_idade['Impressões_num'].idxmax()]
     
     # Total da faixa 25 a 44 anos (maior foco)
-    impressoes_25_44 = data['idade'][data['idade']['Faixa de idade'].isin(['25 a 34', '35 a 44'])]['Impressões_num'].sum()
-    percentual_25_44 = (impressoes_25_44 / data['idade']['Impressões_num'].sum()) * 100
+    percentual_25_44 = df_idade.loc[df_idade['Faixa de idade'].isin(['25 a 34', '35 a 44']), 'Porcentagem_num'].sum()
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Distribuição por Idade
-        fig = px.pie(data['idade'], values='Impressões_num', names='Faixa de idade',
+        fig = px.pie(df_idade, values='Impressões_num', names='Faixa de idade',
                          title='Distribuição por Faixa Etária',
                          hole=0.4)
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
         
         # Distribuição por Sexo
-        fig = px.pie(data['sexo'], values='Impressões_num', names='Sexo',
+        fig = px.pie(df_sexo, values='Impressões_num', names='Sexo',
                          title='Distribuição por Sexo',
                          hole=0.4)
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
     
     with col2:
         # Sexo e Idade combinados
-        fig = px.bar(data['sexo_idade'], x='Faixa de idade', y='Impressões_num', color='Sexo',
+        fig = px.bar(df_sexo_idade, x='Faixa de idade', y='Impressões_num', color='Sexo',
                          title='Impressões por Sexo e Faixa Etária',
                          barmode='group')
         fig.update_layout(xaxis_title='Faixa Etária', yaxis_title='Impressões')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
+        botoes_exportacao_tabela('impressoes_sexo_idade', df_sexo_idade)
         
         # Métricas demográficas
         st.subheader("📋 Insights Demográficos")
@@ -374,91 +1785,150 @@ with tab2:
     with col3:
         # Impressões do segmento mais engajado (Sexo e Idade)
         st.metric(f"{segmento_mais_engajado['Sexo']} {segmento_mais_engajado['Faixa de idade']}", f"{segmento_mais_engajado['Impressões_num']:,.0f}", f"{segmento_mais_engajado['Porcentagem_num']:.1f}% do total")
+    
+    # Conferência do cubo (Sexo x Idade) com os relatórios por idade e por sexo
+    conferencia = demografia['conferencia']
+    if not conferencia.empty:
+        maior_divergencia = conferencia['Diferença (%)'].abs().max()
+        if maior_divergencia > DIVERGENCIA_MAXIMA_PCT:
+            st.warning(f"⚠️ Os totais por Sexo x Idade divergem até {maior_divergencia:.1f}% dos relatórios por idade/sexo.")
+        with st.expander(f"Conferência dos relatórios demográficos (diferença máxima: {maior_divergencia:.2f}%)"):
+            st.dataframe(conferencia, use_container_width=True, hide_index=True)
 
 # --- ABA 3: Palavras-chave ---
-with tab3:
+with tab3, medir('aba:palavras_chave'):
     st.subheader("🔍 Análise de Palavras-chave e Pesquisas")
     
-    # Palavras-chave com desempenho
-    palavras_ativas = data['palavras_chave'][data['palavras_chave']['Cliques_num'] > 0]
-    # Palavras-chave com Custo > 0, mas Cliques == 0 (dinheiro gasto sem retorno)
-    palavras_gastando_sem_clique = data['palavras_chave'][
-        (data['palavras_chave']['Custo_num'] > 0) & 
-        (data['palavras_chave']['Cliques_num'] == 0)
-    ]
-    palavras_sem_cliques_total = data['palavras_chave'][data['palavras_chave']['Cliques_num'] == 0]
-    
-    col1, col2, col3, col4 = st.columns(4)
+    # Agregados calculados no carregamento (relatório inteiro ou em blocos)
+    resumo_palavras = data['resumo_palavras_chave']
+    qtd_gastando_sem_clique = resumo_palavras['gastando_sem_clique']
+    custo_sem_clique = resumo_palavras['custo_sem_clique']
     
-    with col1:
-        st.metric("Total de Palavras-chave", len(data['palavras_chave']))
-    
-    with col2:
-        st.metric("Com Cliques", len(palavras_ativas))
+    # Variações do mesmo termo (plural, acentos, "em"/"para") somadas num grupo só
+    agrupar_semelhantes = st.toggle("🧩 Agrupar termos semelhantes", value=True,
+                                    help="Soma as métricas de variações do mesmo termo, como plurais, acentos e palavras como 'em' e 'para'.")
+    grupos_palavras = resumo_palavras['grupos']
+    grupos_pesquisas = data['resumo_termos_pesquisa']['grupos']
     
-    with col3:
-        st.metric("Gastando sem Cliques", len(palavras_gastando_sem_clique))
+    col1, col2, col3, col4 = st.columns(4)
     
-    with col4:
-        # Custo total em palavras-chave que não deram cliques
-        custo_sem_clique = palavras_gastando_sem_clique['Custo_num'].sum()
-        st.metric("Custo em Ineficientes", f"R$ {custo_sem_clique:,.2f}")
+    if agrupar_semelhantes:
+        # Grupo ineficiente: custo no grupo todo sem nenhum clique
+        grupos_sem_clique = grupos_palavras[filtro_gastando_sem_clique(grupos_palavras)]
+        with col1:
+            st.metric("Grupos de Palavras-chave", len(grupos_palavras), help=f"{resumo_palavras['total']} palavras-chave")
+        with col2:
+            st.metric("Grupos com Cliques", int(filtro_com_cliques(grupos_palavras).sum()))
+        with col3:
+            st.metric("Grupos Gastando sem Cliques", len(grupos_sem_clique))
+        with col4:
+            st.metric("Custo em Grupos Ineficientes", f"R$ {grupos_sem_clique['Custo_num'].sum():,.2f}")
+            if len(grupos_sem_clique) > 0:
+                botoes_exportacao_tabela('grupos_gastando_sem_clique', grupos_sem_clique)
+        # Os insights das abas 5 a 7 seguem o mesmo modo da aba 3
+        qtd_ineficientes = len(grupos_sem_clique)
+        custo_ineficientes = grupos_sem_clique['Custo_num'].sum()
+        unidade_ineficientes = 'grupos de palavras-chave'
+    else:
+        with col1:
+            st.metric("Total de Palavras-chave", resumo_palavras['total'])
+        with col2:
+            st.metric("Com Cliques", resumo_palavras['com_cliques'])
+        with col3:
+            st.metric("Gastando sem Cliques", qtd_gastando_sem_clique)
+        with col4:
+            # Custo total em palavras-chave que não deram cliques
+            st.metric("Custo em Ineficientes", f"R$ {custo_sem_clique:,.2f}")
+            if qtd_gastando_sem_clique > 0:
+                botoes_exportacao('palavras_gastando_sem_clique',
+                                  partial(blocos_filtrados, data, pasta_conta, 'palavras_chave', filtro_gastando_sem_clique),
+                                  qtd_gastando_sem_clique)
+        qtd_ineficientes = qtd_gastando_sem_clique
+        custo_ineficientes = custo_sem_clique
+        unidade_ineficientes = 'palavras-chave'
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Top palavras-chave por CTR
-        if not palavras_ativas.empty:
-            top_ctr = palavras_ativas.nlargest(10, 'CTR_num')
-            fig = px.bar(top_ctr, 
+        if resumo_palavras['com_cliques'] > 0:
+            fig = px.bar(resumo_palavras['top_ctr'], 
                          x='Palavra-chave da rede de pesquisa', y='CTR_num',
                          title='Top 10 Palavras-chave por CTR (%)',
                          color='CTR_num',
                          color_continuous_scale='viridis')
             fig.update_layout(yaxis_title='CTR (%)', xaxis_tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+            exibir_grafico(fig)
+            botoes_exportacao_tabela('top_palavras_ctr', resumo_palavras['top_ctr'])
     
     with col2:
         # Top palavras-chave por cliques
-        if not palavras_ativas.empty:
-            top_cliques = palavras_ativas.nlargest(10, 'Cliques_num')
-            fig = px.bar(top_cliques, 
+        if resumo_palavras['com_cliques'] > 0 and agrupar_semelhantes:
+            top_grupos = grupos_palavras.nlargest(TOP_N, 'Cliques_num')
+            fig = px.bar(top_grupos, x='Grupo', y='Cliques_num',
+                         title='Top 10 Grupos de Palavras-chave por Cliques',
+                         color='Cliques_num',
+                         color_continuous_scale='blues',
+                         hover_data=['Variações'])
+            fig.update_layout(yaxis_title='Cliques', xaxis_tickangle=45)
+            exibir_grafico(fig)
+            botoes_exportacao_tabela('top_grupos_palavras_cliques', top_grupos)
+        elif resumo_palavras['com_cliques'] > 0:
+            fig = px.bar(resumo_palavras['top_cliques'], 
                          x='Palavra-chave da rede de pesquisa', y='Cliques_num',
                          title='Top 10 Palavras-chave por Cliques',
                          color='Cliques_num',
                          color_continuous_scale='blues')
             fig.update_layout(yaxis_title='Cliques', xaxis_tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+            exibir_grafico(fig)
+            botoes_exportacao_tabela('top_palavras_cliques', resumo_palavras['top_cliques'])
     
     # Análise de eficiência
     st.subheader("💰 Análise de Eficiência por Palavra-chave")
     
-    if not palavras_ativas.empty:
-        # Evita divisão por zero para CTR e Custo/Clique
-        palavras_ativas['Custo_por_Clique'] = palavras_ativas['Custo_num'] / palavras_ativas['Cliques_num'].replace(0, np.nan) 
-        
-        fig = px.scatter(palavras_ativas.dropna(subset=['Custo_por_Clique']), # Remove os NaNs gerados
+    if resumo_palavras['com_cliques'] > 0:
+        # Palavras com cliques (as LIMITE_DISPERSAO maiores), já com Custo_por_Clique
+        fig = px.scatter(resumo_palavras['dispersao'],
                          x='Custo_por_Clique', y='CTR_num',
                          size='Cliques_num', color='Custo_num',
                          hover_name='Palavra-chave da rede de pesquisa',
                          title='Relação Custo/Clique vs CTR (Tamanho: Cliques)',
                          labels={'Custo_por_Clique': 'Custo por Clique (R$)', 'CTR_num': 'CTR (%)'})
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
+        # Exporta todas as palavras com cliques, não só os pontos do gráfico
+        botoes_exportacao('palavras_com_cliques',
+                          partial(blocos_filtrados, data, pasta_conta, 'palavras_chave', filtro_com_cliques),
+                          resumo_palavras['com_cliques'])
     
     # Top pesquisas reais
     st.subheader("🔎 Top Pesquisas dos Usuários (por Cliques)")
     
-    if 'Cliques_num' in data['pesquisas'].columns and not data['pesquisas'].empty:
-        top_pesquisas = data['pesquisas'].nlargest(10, 'Cliques_num')
-        fig = px.bar(top_pesquisas, x='Pesquisar', y='Cliques_num',
+    if agrupar_semelhantes and len(grupos_pesquisas) > 0:
+        top_grupos = grupos_pesquisas.nlargest(TOP_N, 'Cliques_num')
+        fig = px.bar(top_grupos, x='Grupo', y='Cliques_num',
+                     title='Top 10 Grupos de Pesquisas por Cliques',
+                     color='Cliques_num',
+                     color_continuous_scale='purples',
+                     hover_data=['Variações', 'Custo_num'])
+        fig.update_layout(xaxis_tickangle=45)
+        exibir_grafico(fig)
+        
+        with st.expander(f"🧩 {len(grupos_pesquisas)} grupos formados a partir de {data['resumo_termos_pesquisa']['total']} termos pesquisados"):
+            st.dataframe(grupos_pesquisas.rename(columns={
+                'Custo_num': 'Custo (R$)', 'Cliques_num': 'Cliques',
+                'Impressões_num': 'Impressões', 'Conversões_num': 'Conversões'}), hide_index=True)
+            botoes_exportacao_tabela('termos_por_grupo', data['resumo_termos_pesquisa']['termos'])
+    elif data['resumo_pesquisas']['total'] > 0:
+        fig = px.bar(data['resumo_pesquisas']['top_cliques'], x='Pesquisar', y='Cliques_num',
                      title='Top 10 Pesquisas por Cliques',
                      color='Cliques_num',
                      color_continuous_scale='purples')
         fig.update_layout(xaxis_tickangle=45)
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
+        botoes_exportacao_tabela('top_pesquisas', data['resumo_pesquisas']['top_cliques'])
 
 # --- ABA 4: Dispositivos & Redes ---
-with tab4:
+with tab4, medir('aba:dispositivos_redes'):
     st.subheader("📱 Análise por Dispositivos e Redes")
     
     col1, col2 = st.columns(2)
@@ -467,14 +1937,14 @@ with tab4:
         # Dispositivos - Impressões
         fig = px.pie(data['dispositivos'], values='Impressões_num', names='Dispositivo',
                          title='Distribuição por Dispositivo - Impressões')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
         
         # Dispositivos - Custo
         fig = px.bar(data['dispositivos'], x='Dispositivo', y='Custo_num',
                          title='Custo por Dispositivo (R$)',
                          color='Custo_num',
                          color_continuous_scale='greens')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
     
     with col2:
         # Redes - Cliques (USANDO DADOS SIMULADOS)
@@ -482,29 +1952,27 @@ with tab4:
                          title='Cliques por Rede (SIMULADO)',
                          color='Cliques_num',
                          color_continuous_scale='purples')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
         
         # CPC por rede (USANDO DADOS SIMULADOS)
         fig = px.bar(data['redes'], x='Rede', y='CPC_num',
                          title='CPC Médio por Rede (R$) (SIMULADO)',
                          color='CPC_num',
                          color_continuous_scale='oranges')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
     
     # Análise de eficiência por dispositivo
     st.subheader("📊 Eficiência por Dispositivo")
     
-    # Recálculo de CTR e CPC para o gráfico de dispersão
-    data['dispositivos']['CTR'] = (data['dispositivos']['Cliques_num'] / data['dispositivos']['Impressões_num'].replace(0, np.nan) * 100).fillna(0)
-    data['dispositivos']['Custo_por_Clique'] = data['dispositivos']['Custo_num'] / data['dispositivos']['Cliques_num'].replace(0, np.nan)
-    
+    # CTR e CPC por dispositivo são calculados no carregamento
     df_disp_plot = data['dispositivos'][data['dispositivos']['Cliques_num'] > 0]
     
     fig = px.scatter(df_disp_plot, x='Custo_por_Clique', y='CTR',
                          size='Impressões_num', color='Dispositivo',
                          title='Eficiência: Custo por Clique vs CTR por Dispositivo (Tamanho: Impressões)',
                          labels={'Custo_por_Clique': 'Custo por Clique (R$)', 'CTR': 'CTR (%)'})
-    st.plotly_chart(fig, use_container_width=True)
+    exibir_grafico(fig)
+    botoes_exportacao_tabela('eficiencia_dispositivos', df_disp_plot)
     
     # Insights de dispositivos
     st.subheader("💡 Insights de Dispositivos")
@@ -531,13 +1999,13 @@ with tab4:
          st.warning("Dados de Smartphones não encontrados.")
 
 # --- ABA 5: Conversões ---
-with tab5:
+with tab5, medir('aba:conversoes'):
     st.header("🔄 Análise de Conversões")
     
     # Métricas de conversão
     col1, col2, col3, col4 = st.columns(4)
     
-    total_conversoes = data['pesquisas']['Conversões_num'].sum()
+    total_conversoes = data['resumo_pesquisas']['conversoes']
     taxa_conversao = (total_conversoes / total_cliques * 100) if total_cliques > 0 else 0
     custo_por_conversao = total_custo / total_conversoes if total_conversoes > 0 else total_custo
     
@@ -582,14 +2050,14 @@ with tab5:
         fig = px.funnel(funnel_data, x='Quantidade', y='Estágio', 
                          title='Funil de Conversão - Quantidade',
                          color='Estágio')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
     
     with col2:
         fig = px.bar(funnel_data, x='Taxa Conversão', y='Estágio',
                          title='Taxa de Conversão por Estágio (%)',
                          orientation='h',
                          color='Estágio')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
     
     # Análise de potencial de conversão (Valores ajustados para o setor Imobiliário)
     st.subheader("🎯 Análise de Potencial de Conversão")
@@ -668,70 +2136,126 @@ with tab5:
     with col3:
         st.warning(f"""
         **💡 Qualidade/Intenção da Palavra-chave**
-        - {len(palavras_gastando_sem_clique)} palavras-chave gastando dinheiro (R$ {custo_sem_clique:,.2f}) sem gerar cliques.
+        - {qtd_ineficientes} {unidade_ineficientes} gastando dinheiro (R$ {custo_ineficientes:,.2f}) sem gerar cliques.
         - **Foco:** Palavras como 'alugar', 'temporada' podem ter intenção diferente de 'comprar/investir'.
         """)
 
 # --- ABA 6: Comparativo ---
-with tab6:
+with tab6, medir('aba:comparativo'):
     st.header("📊 Comparativo de Performance")
     
-    # Dados para comparação (benchmarks da indústria de Imobiliário de Luxo/Nicho - AJUSTADOS)
-    benchmarks = {
-        'Métrica': ['CTR', 'CPC (R$)', 'Taxa de Conversão (Lead)'],
-        'Nossa Campanha': [ctr_medio, cpc_medio, taxa_conversao],
-        'Média do Setor': [1.5, 2.50, 1.5], # Ajustado: CTR Imob. é menor, CPC é maior
-        'Top Performers': [3.0, 1.50, 4.0] # Ajustado
+    # Benchmarks: distribuição entre as contas disponíveis ou, com poucas contas, a referência do setor
+    with st.spinner("Calculando benchmarks entre contas..."):
+        versao_benchmarks = versao_contas_recente()
+        # Conta criada depois da última leitura: relê a versão antes de o TTL expirar
+        if conta_atual not in [conta for conta, _, _ in versao_benchmarks]:
+            versao_contas_recente.clear()
+            versao_benchmarks = versao_contas_recente()
+        benchmarks = calcular_benchmarks(versao_benchmarks)
+    chaves_metricas = [chave for chave, _, _ in METRICAS_BENCHMARK]
+    rotulos_metricas = [rotulo for _, rotulo, _ in METRICAS_BENCHMARK]
+    nossa_campanha = {
+        'ctr': ctr_medio,
+        'cpc': cpc_medio,
+        'taxa_conversao': taxa_conversao,
+        'custo_por_conversao': custo_por_conversao if total_conversoes > 0 else np.nan,
     }
     
-    df_benchmarks = pd.DataFrame(benchmarks)
-    
-    # Normalização de métricas para o gráfico de radar (Ex: CPC é melhor quanto MENOR)
-    df_benchmarks['Nossa Campanha Normalizada'] = df_benchmarks['Nossa Campanha'].copy()
-    
-    # Inverte a pontuação para Custo (CPC): Maior valor -> pior desempenho (menor pontuação no radar)
-    max_cpc = max(df_benchmarks['Média do Setor'].max(), df_benchmarks['Nossa Campanha'].max())
-    min_cpc = min(df_benchmarks['Média do Setor'].min(), df_benchmarks['Nossa Campanha'].min())
-    
-    # Normalização simples (a inversão de escala é mais complexa, vou apenas inverter o valor no plot)
-    # df_benchmarks['Nossa Campanha Normalizada'] = np.where(df_benchmarks['Métrica'] == 'CPC (R$)', max_cpc - df_benchmarks['Nossa Campanha'] + min_cpc, df_benchmarks['Nossa Campanha'])
-    # df_benchmarks['Média do Setor Normalizada'] = np.where(df_benchmarks['Métrica'] == 'CPC (R$)', max_cpc - df_benchmarks['Média do Setor'] + min_cpc, df_benchmarks['Média do Setor'])
+    # Sem a conta atual na versão (removida entre as leituras), vale a referência fixa
+    usa_contas = len(benchmarks['contas']) >= MIN_CONTAS_BENCHMARK and conta_atual in benchmarks['contas']
+    if usa_contas:
+        nome_referencia, nome_top = 'Mediana das Contas', 'Quartil Superior'
+        referencia = dict(zip(chaves_metricas, benchmarks['mediana']))
+        top_performers = dict(zip(chaves_metricas, benchmarks['quartil_superior']))
+        percentis = dict(zip(chaves_metricas, benchmarks['percentis'][benchmarks['contas'].index(conta_atual)]))
+    else:
+        nome_referencia, nome_top = 'Média do Setor', 'Top Performers'
+        referencia = REFERENCIA_SETOR
+        top_performers = TOP_PERFORMERS_SETOR
+        percentis = dict.fromkeys(chaves_metricas, np.nan)
+    
+    df_benchmarks = pd.DataFrame({
+        'Métrica': rotulos_metricas,
+        'Nossa Campanha': [nossa_campanha[chave] for chave in chaves_metricas],
+        nome_referencia: [referencia[chave] for chave in chaves_metricas],
+        nome_top: [top_performers[chave] for chave in chaves_metricas],
+        'Percentil': [percentis[chave] for chave in chaves_metricas],
+    })
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.subheader("📈 Comparativo com Benchmarks (SIMPLIFICADO)")
-        
-        # Gráfico de radar (Simples, sem normalização complexa de escala para CPC)
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatterpolar(
-            r=df_benchmarks['Nossa Campanha'].tolist(),
-            theta=df_benchmarks['Métrica'].tolist(),
-            fill='toself',
-            name='Nossa Campanha',
-            line_color='blue'
-        ))
-        
-        fig.add_trace(go.Scatterpolar(
-            r=df_benchmarks['Média do Setor'].tolist(),
-            theta=df_benchmarks['Métrica'].tolist(),
-            fill='toself',
-            name='Média do Setor',
-            line_color='orange'
-        ))
-        
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, max(df_benchmarks[['Nossa Campanha', 'Média do Setor']].max().max(), 4)]
-                )),
-            showlegend=True,
-            title="Comparativo de Performance vs Benchmarks do Setor"
-        )
+        if usa_contas:
+            st.subheader(f"📈 Posição entre {len(benchmarks['contas'])} Contas (Percentil)")
+            
+            # Radar em percentis: todas as métricas na mesma escala e CPC/custos já invertidos
+            df_radar = df_benchmarks.dropna(subset=['Percentil'])
+            fig = go.Figure()
+            
+            fig.add_trace(go.Scatterpolar(
+                r=df_radar['Percentil'].tolist(),
+                theta=df_radar['Métrica'].tolist(),
+                fill='toself',
+                name='Nossa Campanha',
+                line_color='blue'
+            ))
+            
+            fig.add_trace(go.Scatterpolar(
+                r=[50] * len(df_radar),
+                theta=df_radar['Métrica'].tolist(),
+                fill='toself',
+                name=nome_referencia,
+                line_color='orange'
+            ))
+            
+            fig.add_trace(go.Scatterpolar(
+                r=[75] * len(df_radar),
+                theta=df_radar['Métrica'].tolist(),
+                name=nome_top,
+                line=dict(color='green', dash='dash')
+            ))
+            
+            fig.update_layout(
+                polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
+                showlegend=True,
+                title="Percentil da Campanha entre as Contas (100 = melhor)"
+            )
+        else:
+            st.subheader("📈 Comparativo com Benchmarks do Setor")
+            st.caption(f"Menos de {MIN_CONTAS_BENCHMARK} contas disponíveis: usando a referência fixa do setor.")
+            
+            # Gráfico de radar (valores absolutos; CTR, CPC e Conversão)
+            df_radar = df_benchmarks.iloc[:3]
+            fig = go.Figure()
+            
+            fig.add_trace(go.Scatterpolar(
+                r=df_radar['Nossa Campanha'].tolist(),
+                theta=df_radar['Métrica'].tolist(),
+                fill='toself',
+                name='Nossa Campanha',
+                line_color='blue'
+            ))
+            
+            fig.add_trace(go.Scatterpolar(
+                r=df_radar[nome_referencia].tolist(),
+                theta=df_radar['Métrica'].tolist(),
+                fill='toself',
+                name=nome_referencia,
+                line_color='orange'
+            ))
+            
+            fig.update_layout(
+                polar=dict(
+                    radialaxis=dict(
+                        visible=True,
+                        range=[0, max(df_radar[['Nossa Campanha', nome_referencia]].max().max(), 4)]
+                    )),
+                showlegend=True,
+                title="Comparativo de Performance vs Benchmarks do Setor"
+            )
         
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
+        st.dataframe(df_benchmarks.set_index('Métrica'), use_container_width=True)
     
     with col2:
         st.subheader("🎯 Análise Competitiva")
@@ -739,27 +2263,26 @@ with tab6:
         # Métricas comparativas
         col2_1, col2_2, col2_3 = st.columns(3)
         
-        # Comparação com a Média do Setor (1.5% CTR, R$ 2.50 CPC, 1.5% Conversão)
-        ctr_media = 1.5
-        cpc_media = 2.50
-        conv_media = 1.5
+        def ajuda_percentil(chave):
+            if np.isnan(percentis[chave]):
+                return None
+            return f"Percentil {percentis[chave]:.0f} entre {len(benchmarks['contas'])} contas"
         
         with col2_1:
-            delta_ctr = ctr_medio - ctr_media
-            st.metric("CTR vs Média", f"{ctr_medio:.2f}%", f"{delta_ctr:+.2f}%", delta_color="normal")
-            delta_cpc = cpc_media - cpc_medio # Diferença invertida para Custo: CPC menor é bom
-            st.metric("CPC vs Média", f"R$ {cpc_medio:.2f}", f"R$ {delta_cpc:+.2f}", delta_color="inverse")
+            delta_ctr = ctr_medio - referencia['ctr']
+            st.metric(f"CTR vs {nome_referencia}", f"{ctr_medio:.2f}%", f"{delta_ctr:+.2f}%", delta_color="normal", help=ajuda_percentil('ctr'))
+            delta_cpc = cpc_medio - referencia['cpc'] # Custo: CPC acima da referência aparece em vermelho
+            st.metric(f"CPC vs {nome_referencia}", f"R$ {cpc_medio:.2f}", f"R$ {delta_cpc:+.2f}", delta_color="inverse", help=ajuda_percentil('cpc'))
         
         with col2_2:
-            delta_conv = taxa_conversao - conv_media
-            st.metric("Taxa Conversão", f"{taxa_conversao:.2f}%", f"{delta_conv:+.2f}%", delta_color="normal")
-            # Custo por Conversão vs Média do Setor (R$ 100,00)
-            cpc_conv_media = 100.00
-            delta_cpc_conv = cpc_conv_media - custo_por_conversao
-            if total_conversoes > 0:
-                st.metric("Custo/Conversão", f"R$ {custo_por_conversao:,.2f}", f"R$ {delta_cpc_conv:+.2f}", delta_color="inverse")
+            delta_conv = taxa_conversao - referencia['taxa_conversao']
+            st.metric("Taxa Conversão", f"{taxa_conversao:.2f}%", f"{delta_conv:+.2f}%", delta_color="normal", help=ajuda_percentil('taxa_conversao'))
+            # Custo por Conversão vs referência
+            if total_conversoes > 0 and not np.isnan(referencia['custo_por_conversao']):
+                delta_cpc_conv = custo_por_conversao - referencia['custo_por_conversao']
+                st.metric("Custo/Conversão", f"R$ {custo_por_conversao:,.2f}", f"R$ {delta_cpc_conv:+.2f}", delta_color="inverse", help=ajuda_percentil('custo_por_conversao'))
             else:
-                st.metric("Custo/Conversão", "N/A", "R$ -100.00", delta_color="inverse")
+                st.metric("Custo/Conversão", "N/A")
         
         with col2_3:
             st.metric("Pontuação Otimização", "86.2%", "Alto")
@@ -773,10 +2296,13 @@ with tab6:
         with col_swot1:
             st.markdown("""
             **✅ FORÇAS**
-            - **CTR ({ctr:.2f}%)** muito acima da média do setor imobiliário (**1.5%**).
-            - **CPC ({cpc:.2f}%)** muito competitivo (abaixo da média de **R$ 2.50**).
+            - **CTR ({ctr:.2f}%)** {pos_ctr} da referência (**{nome_ref}: {ctr_ref:.2f}%**).
+            - **CPC (R$ {cpc:.2f})** {pos_cpc} da referência (**{nome_ref}: R$ {cpc_ref:.2f}**).
             - Forte engajamento do público **Feminino 35-44**.
-            """.format(ctr=ctr_medio, cpc=cpc_medio))
+            """.format(ctr=ctr_medio, cpc=cpc_medio, nome_ref=nome_referencia,
+                       ctr_ref=referencia['ctr'], cpc_ref=referencia['cpc'],
+                       pos_ctr='acima' if ctr_medio >= referencia['ctr'] else 'abaixo',
+                       pos_cpc='abaixo' if cpc_medio <= referencia['cpc'] else 'acima'))
             
             st.markdown("""
             **🔄 OPORTUNIDADES**
@@ -789,9 +2315,9 @@ with tab6:
             st.markdown("""
             **❌ FRAQUEZAS**
             - **Conversão {conv:,.0f}**: Não há leads sendo rastreados.
-            - **Custo em Palavras-Chave Ineficientes:** R$ {custo_sem_clique:,.2f} gasto em termos sem cliques.
+            - **Custo em Palavras-Chave Ineficientes:** R$ {custo_ineficientes:,.2f} gasto em {unidade} sem cliques.
             - **Disparidade de Dispositivos:** Quase 100% de dependência de Mobile.
-            """.format(conv=total_conversoes, custo_sem_clique=custo_sem_clique))
+            """.format(conv=total_conversoes, custo_ineficientes=custo_ineficientes, unidade=unidade_ineficientes))
             
             st.markdown("""
             **⚠️ AMEAÇAS**
@@ -809,7 +2335,7 @@ with tab6:
                          barmode='group',
                          labels={'value': 'Quantidade', 'variable': 'Métrica'})
         fig.update_layout(xaxis_title='Rede', yaxis_title='Quantidade')
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
     
     # Comparativo temporal (SIMULADO)
     st.subheader("📅 Evolução Temporal vs Metas (SIMULADO)")
@@ -841,15 +2367,12 @@ with tab6:
             xaxis_tickangle=45
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        exibir_grafico(fig)
 
 # --- ABA 7: Recomendações ---
-with tab7:
+with tab7, medir('aba:recomendacoes'):
     st.header("💡 Análise e Recomendações")
     
-    # Métricas calculadas para análise
-    custo_sem_clique = palavras_gastando_sem_clique['Custo_num'].sum()
-    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -873,7 +2396,7 @@ with tab7:
         
         st.warning(f"""
         **💰 Otimização de Custo Imediata:**
-        - **Ação:** Pausar {len(palavras_gastando_sem_clique)} palavras-chave que custaram **R$ {custo_sem_clique:,.2f}** sem gerar um único clique.
+        - **Ação:** Pausar {qtd_ineficientes} {unidade_ineficientes} que custaram **R$ {custo_ineficientes:,.2f}** sem gerar um único clique.
         - **Ação:** Adicionar palavras-chave negativas para termos de **aluguel de temporada**, 'barato', 'sp' para focar na intenção de compra/investimento.
         
         **💻 Explorar Computador/Tablet:**
@@ -904,4 +2427,147 @@ with tab7:
         2. **IMEDIATO:** **LIMPAR PALAVRAS-CHAVE** com gasto zero cliques e adicionar termos negativos de 'aluguel', 'temporada', 'pousada'.
         3. **OTIMIZAÇÃO:** **TESTAR LANCES MAIS AGRESSIVOS** em Campanhas de Palavras-chave 'Alto Padrão' no Dispositivo **Computador**.
         4. **CRIAÇÃO:** Desenvolver uma Landing Page **EXCLUSIVAMENTE** otimizada para Mobile e com foco em **Captura de Leads (CPL)**.
-        """)
\ No newline at end of file
+        """)
+
+# --- ABA OPCIONAL: Comparação entre Períodos ---
+if modo_comparacao:
+    with aba_periodos, medir('aba:periodos'):
+        st.subheader("📅 Comparação entre Períodos")
+        
+        paineis_periodos = montar_paineis_periodos(pasta_conta, versao_periodos_conta)
+        periodos = paineis_periodos['periodos']
+        qtd_periodos = len(periodos)
+        
+        tipo_comparacao = st.radio("Comparar", ["Janela móvel", "Períodos escolhidos"], horizontal=True)
+        if tipo_comparacao == "Janela móvel":
+            # Últimos N períodos contra os N anteriores
+            maximo_janela = qtd_periodos // 2
+            tamanho_janela = st.slider("Períodos por janela", 1, maximo_janela, 1) if maximo_janela > 1 else 1
+            janela_atual = (qtd_periodos - tamanho_janela, qtd_periodos)
+            janela_base = (qtd_periodos - 2 * tamanho_janela, qtd_periodos - tamanho_janela)
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                inicio, fim = st.select_slider("Janela base", options=range(qtd_periodos), value=(qtd_periodos - 2, qtd_periodos - 2),
+                                               format_func=lambda i: rotulo_periodo(periodos[i]))
+                janela_base = (inicio, fim + 1)
+            with col2:
+                inicio, fim = st.select_slider("Janela atual", options=range(qtd_periodos), value=(qtd_periodos - 1, qtd_periodos - 1),
+                                               format_func=lambda i: rotulo_periodo(periodos[i]))
+                janela_atual = (inicio, fim + 1)
+        
+        st.caption(f"**Base:** {rotulo_janela(periodos, janela_base)} · **Atual:** {rotulo_janela(periodos, janela_atual)}")
+        
+        faltando = sorted({tabela for periodo in periodos[janela_base[0]:janela_base[1]] + periodos[janela_atual[0]:janela_atual[1]]
+                           for tabela in paineis_periodos['faltando'].get(periodo, [])})
+        if faltando:
+            st.warning(f"Relatórios ausentes em algum período das janelas (contados como zero): {', '.join(ARQUIVOS[t].split('(')[0] for t in faltando)}")
+        
+        # KPIs: valores da janela atual com a variação sobre a base
+        kpis = comparar_periodos(pasta_conta, versao_periodos_conta, 'kpis', janela_base, janela_atual).iloc[0]
+        
+        def delta_kpi(atual, base, formato):
+            variacao = f" ({(atual - base) / abs(base) * 100:+.1f}%)" if base else ""
+            return f"{formato(atual - base)}{variacao}"
+        
+        ctr_base = kpis['Cliques (base)'] / kpis['Impressões (base)'] * 100 if kpis['Impressões (base)'] else 0
+        ctr_atual = kpis['Cliques (atual)'] / kpis['Impressões (atual)'] * 100 if kpis['Impressões (atual)'] else 0
+        cpc_base = kpis['Custo (base)'] / kpis['Cliques (base)'] if kpis['Cliques (base)'] else 0
+        cpc_atual = kpis['Custo (atual)'] / kpis['Cliques (atual)'] if kpis['Cliques (atual)'] else 0
+        
+        col1, col2, col3, col4, col5, col6 = st.columns(6)
+        with col1:
+            st.metric("Impressões", f"{kpis['Impressões (atual)']:,.0f}",
+                      delta_kpi(kpis['Impressões (atual)'], kpis['Impressões (base)'], lambda v: f"{v:+,.0f}"))
+        with col2:
+            st.metric("Cliques", f"{kpis['Cliques (atual)']:,.0f}",
+                      delta_kpi(kpis['Cliques (atual)'], kpis['Cliques (base)'], lambda v: f"{v:+,.0f}"))
+        with col3:
+            st.metric("Custo", f"R$ {kpis['Custo (atual)']:,.2f}",
+                      delta_kpi(kpis['Custo (atual)'], kpis['Custo (base)'], lambda v: f"R$ {v:+,.2f}"), delta_color="inverse")
+        with col4:
+            st.metric("Conversões", f"{kpis['Conversões (atual)']:,.0f}",
+                      delta_kpi(kpis['Conversões (atual)'], kpis['Conversões (base)'], lambda v: f"{v:+,.0f}"))
+        with col5:
+            st.metric("CTR", f"{ctr_atual:.2f}%", f"{ctr_atual - ctr_base:+.2f} p.p.")
+        with col6:
+            st.metric("CPC", f"R$ {cpc_atual:.2f}", f"R$ {cpc_atual - cpc_base:+.2f}", delta_color="inverse")
+        
+        # Variações por linha de cada dimensão, alinhadas pela chave
+        for dimensao, (rotulo, _, _, metricas) in DIMENSOES_PERIODO.items():
+            st.markdown("---")
+            st.subheader(f"{rotulo}: variação entre as janelas")
+            variacoes = comparar_periodos(pasta_conta, versao_periodos_conta, dimensao, janela_base, janela_atual)
+            if len(variacoes) == 0:
+                st.info("Sem dados nas janelas escolhidas.")
+                continue
+            
+            principal = metricas[0][0]
+            maiores = variacoes.head(TOP_N)
+            fig = px.bar(maiores, x=rotulo, y=f'Δ {principal}',
+                         title=f'Maiores Variações de {principal} por {rotulo}',
+                         color=f'Δ {principal}',
+                         color_continuous_scale='RdYlGn_r' if principal == 'Custo' else 'RdYlGn',
+                         color_continuous_midpoint=0,
+                         hover_data=[f'{principal} (base)', f'{principal} (atual)', f'Δ {principal} (%)'])
+            fig.update_layout(xaxis_tickangle=45)
+            exibir_grafico(fig)
+            
+            with st.expander(f"Todas as {len(variacoes)} linhas de {rotulo.lower()}"):
+                st.dataframe(variacoes, hide_index=True)
+                botoes_exportacao_tabela(f'variacao_{dimensao}', variacoes)
+
+# --- ABA OCULTA: Desempenho ---
+if mostrar_aba_admin:
+    with aba_desempenho:
+        st.header("⏱️ Desempenho do Dashboard")
+        st.caption(f"Métricas exportadas para `{PERF_ARQUIVO}` (formato texto do Prometheus).")
+
+        registro = _registro_desempenho()
+        with registro['lock']:
+            etapas = {nome: dict(valores) for nome, valores in registro['etapas'].items()}
+
+        if etapas:
+            df_etapas = pd.DataFrame.from_dict(etapas, orient='index')
+            df_etapas.index.name = 'Etapa'
+            df_etapas['pico_memoria_mb'] = df_etapas['pico_memoria_bytes'] / 1024 ** 2
+            df_etapas = df_etapas.sort_values('ultimo_tempo_s', ascending=False)
+
+            st.dataframe(df_etapas.drop(columns=['pico_memoria_bytes']), use_container_width=True)
+            st.caption("Pico de memória: valor do processo inteiro (tracemalloc), registrado só em "
+                       "execuções sem outras sessões ativas ao mesmo tempo.")
+
+            fig = px.bar(df_etapas.head(20).reset_index(), x='ultimo_tempo_s', y='Etapa',
+                         title='Etapas mais lentas (última execução)',
+                         orientation='h',
+                         color='pico_memoria_mb',
+                         color_continuous_scale='reds')
+            fig.update_layout(xaxis_title='Tempo (s)', yaxis_title='', yaxis={'autorange': 'reversed'})
+            exibir_grafico(fig)
+        else:
+            st.info("Nenhuma etapa medida ainda.")
+
+        # Dados compartilhados entre sessões
+        st.subheader("🗄️ Dados em Memória")
+        estatisticas = _gerenciador_dados().estatisticas()
+        pedidos = estatisticas['acertos'] + estatisticas['faltas']
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Memória", f"{estatisticas['memoria_bytes'] / 1024 ** 2:,.1f} MB",
+                      f"de {estatisticas['orcamento_bytes'] / 1024 ** 2:,.0f} MB", delta_color="off")
+        with col2:
+            st.metric("Taxa de Acerto", f"{(estatisticas['acertos'] / pedidos * 100) if pedidos > 0 else 0:.1f}%")
+        with col3:
+            st.metric("Carregamentos", f"{estatisticas['faltas']:,}")
+        with col4:
+            st.metric("Despejos (LRU)", f"{estatisticas['despejos']:,}")
+
+        if estatisticas['contas']:
+            df_contas = pd.DataFrame.from_dict(estatisticas['contas'], orient='index')
+            df_contas.index.name = 'Conta'
+            df_contas['MB'] = df_contas['bytes'] / 1024 ** 2
+            st.dataframe(df_contas[['MB', 'refs']].rename(columns={'refs': 'Sessões'}), use_container_width=True)
+
+if PERF_ATIVO:
+    exportar_metricas_prometheus()
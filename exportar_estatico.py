@@ -0,0 +1,452 @@
+import argparse
+import contextlib
+import functools
+import hashlib
+import html
+import json
+import os
+import re
+import runpy
+import sys
+import textwrap
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import relatorios
+from relatorios import listar_contas, versao_contas
+
+# Exporta o dashboard (ads5.py) como HTML estático, uma página por conta, para servir por CDN.
+# O script do dashboard roda sem alterações com um módulo `streamlit` substituto que, em vez de
+# desenhar na tela, registra os elementos (métricas, gráficos Plotly, textos) e os converte em
+# HTML. Contas cujas exportações não mudaram desde a última geração são puladas.
+#
+# Uso: python exportar_estatico.py [pasta_saida] [--processos N] [--forcar]
+
+VERSAO_EXPORTACAO = 1
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+# --- Substituto do Streamlit ---
+
+class Conteiner:
+    def __init__(self, tipo, **atributos):
+        self.tipo = tipo
+        self.atributos = atributos
+        self.filhos = []
+
+    def __enter__(self):
+        _estado['pilha'].append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _estado['pilha'].pop()
+        return False
+
+    def _adicionar(self, tipo, **atributos):
+        no = Conteiner(tipo, **atributos)
+        self.filhos.append(no)
+        return no
+
+    # Elementos de texto
+    def title(self, texto, **_):
+        self._adicionar('titulo', nivel=1, texto=str(texto))
+
+    def header(self, texto, **_):
+        self._adicionar('titulo', nivel=2, texto=str(texto))
+
+    def subheader(self, texto, **_):
+        self._adicionar('titulo', nivel=3, texto=str(texto))
+
+    def caption(self, texto, **_):
+        self._adicionar('legenda', texto=str(texto))
+
+    def markdown(self, texto, unsafe_allow_html=False, **_):
+        self._adicionar('markdown', texto=str(texto), html=unsafe_allow_html)
+
+    def success(self, texto, **_):
+        self._adicionar('alerta', estilo='sucesso', texto=str(texto))
+
+    def info(self, texto, **_):
+        self._adicionar('alerta', estilo='info', texto=str(texto))
+
+    def warning(self, texto, **_):
+        self._adicionar('alerta', estilo='aviso', texto=str(texto))
+
+    def error(self, texto, **_):
+        self._adicionar('alerta', estilo='erro', texto=str(texto))
+
+    # Dados
+    def metric(self, label, value, delta=None, delta_color='normal', help=None, **_):
+        self._adicionar('metrica', rotulo=str(label), valor=str(value),
+                        delta=None if delta is None else str(delta), cor_delta=delta_color, ajuda=help)
+
+    def plotly_chart(self, fig, **_):
+        self._adicionar('grafico', figura=fig.to_json())
+
+    def dataframe(self, df, hide_index=None, **_):
+        self._adicionar('tabela', html=df.to_html(index=not hide_index, classes='tabela', border=0,
+                                                   float_format=lambda valor: f"{valor:,.2f}", na_rep='—'))
+
+    # Layout
+    def columns(self, spec, **_):
+        quantidade = spec if isinstance(spec, int) else len(spec)
+        linha = self._adicionar('colunas')
+        return [linha._adicionar('coluna') for _ in range(quantidade)]
+
+    def tabs(self, rotulos):
+        grupo = self._adicionar('abas')
+        return [grupo._adicionar('aba', rotulo=str(rotulo)) for rotulo in rotulos]
+
+    def expander(self, rotulo, **_):
+        return self._adicionar('expansor', rotulo=str(rotulo))
+
+    def container(self, **_):
+        # Num placeholder (st.empty), .container() substitui o conteúdo
+        if self.tipo == 'espaco':
+            self.filhos.clear()
+            return self
+        return self._adicionar('bloco')
+
+    def empty(self):
+        # Num placeholder, .empty() o limpa; em outros contêineres cria um placeholder
+        if self.tipo == 'espaco':
+            self.filhos.clear()
+            return self
+        return self._adicionar('espaco')
+
+    # Elementos interativos: sem efeito na página estática
+    def popover(self, *_, **__):
+        return self._adicionar('oculto')
+
+    def download_button(self, *_, **__):
+        return False
+
+    def selectbox(self, label, options, index=0, **_):
+        opcoes = list(options)
+        return opcoes[index] if opcoes and index is not None else None
+
+    def multiselect(self, label, options, default=None, **_):
+        return list(default or [])
+
+    def toggle(self, label, value=False, **_):
+        return value
+
+    def spinner(self, *_, **__):
+        return contextlib.nullcontext()
+
+_estado = {}
+_caches = {}
+
+def _atual():
+    return _estado['pilha'][-1]
+
+# st.cache_data / st.cache_resource: memoização simples por processo
+def _cache(funcao=None, **_opcoes):
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            chave = (funcao.__qualname__, args, tuple(sorted(kwargs.items())))
+            if chave not in _caches:
+                _caches[chave] = funcao(*args, **kwargs)
+            return _caches[chave]
+        return envolvida
+    return decorar(funcao) if funcao is not None else decorar
+
+def _rerun():
+    raise RuntimeError("st.rerun() não é suportado na exportação estática")
+
+def _set_page_config(page_title=None, **_):
+    _estado['titulo'] = page_title
+
+def criar_streamlit_estatico(conta):
+    raiz = Conteiner('pagina')
+    _estado.update({'raiz': raiz, 'pilha': [raiz], 'sidebar': Conteiner('sidebar'), 'titulo': None})
+
+    modulo = types.ModuleType('streamlit')
+    for nome in ['title', 'header', 'subheader', 'caption', 'markdown', 'success', 'info', 'warning', 'error',
+                 'metric', 'plotly_chart', 'dataframe', 'columns', 'tabs', 'expander', 'container', 'empty',
+                 'popover', 'download_button', 'selectbox', 'multiselect', 'toggle', 'spinner']:
+        setattr(modulo, nome, functools.partial(lambda nome, *args, **kwargs: getattr(_atual(), nome)(*args, **kwargs), nome))
+    modulo.sidebar = _estado['sidebar']
+    modulo.cache_data = _cache
+    modulo.cache_resource = _cache
+    modulo.set_page_config = _set_page_config
+    modulo.rerun = _rerun
+    modulo.query_params = {} if conta is None else {'conta': conta}
+    modulo.session_state = {}
+    return modulo
+
+# --- Conversão para HTML ---
+
+def _markdown_inline(texto):
+    texto = html.escape(texto)
+    texto = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', texto)
+    texto = re.sub(r'`(.+?)`', r'<code>\1</code>', texto)
+    return texto
+
+# Subconjunto de Markdown usado no dashboard: títulos, listas, negrito, código e separadores
+def markdown_para_html(texto):
+    partes = []
+    lista = None
+    for linha in textwrap.dedent(texto).strip().splitlines():
+        linha = linha.strip()
+        item = re.match(r'^(-|\d+\.)\s+(.*)$', linha)
+        tipo_lista = None if item is None else ('ul' if item.group(1) == '-' else 'ol')
+        if lista is not None and tipo_lista != lista:
+            partes.append(f'</{lista}>')
+            lista = None
+        if item is not None:
+            if lista is None:
+                partes.append(f'<{tipo_lista}>')
+                lista = tipo_lista
+            partes.append(f'<li>{_markdown_inline(item.group(2))}</li>')
+            continue
+        if not linha:
+            continue
+        titulo = re.match(r'^(#{1,6})\s+(.*)$', linha)
+        if linha == '---':
+            partes.append('<hr>')
+        elif titulo is not None:
+            nivel = len(titulo.group(1))
+            partes.append(f'<h{nivel}>{_markdown_inline(titulo.group(2))}</h{nivel}>')
+        else:
+            partes.append(f'<p>{_markdown_inline(linha)}</p>')
+    if lista is not None:
+        partes.append(f'</{lista}>')
+    return '\n'.join(partes)
+
+def _classe_delta(delta, cor):
+    if delta is None or cor == 'off':
+        return 'neutro'
+    negativo = delta.lstrip().startswith('-')
+    if cor == 'inverse':
+        negativo = not negativo
+    return 'negativo' if negativo else 'positivo'
+
+def renderizar(no, contador):
+    filhos = ''.join(renderizar(filho, contador) for filho in no.filhos)
+    a = no.atributos
+    if no.tipo in ('pagina', 'bloco', 'espaco', 'coluna'):
+        return filhos if no.tipo != 'coluna' else f'<div class="coluna">{filhos}</div>'
+    if no.tipo == 'sidebar':
+        return f'<aside>{filhos}</aside>'
+    if no.tipo == 'colunas':
+        return f'<div class="colunas">{filhos}</div>'
+    if no.tipo == 'abas':
+        contador['abas'] += 1
+        grupo = f"abas{contador['abas']}"
+        botoes = ''.join(
+            f'<button class="aba{" ativa" if i == 0 else ""}" data-grupo="{grupo}" data-indice="{i}">{html.escape(aba.atributos["rotulo"])}</button>'
+            for i, aba in enumerate(no.filhos))
+        paineis = ''.join(
+            f'<div class="painel" data-grupo="{grupo}" data-indice="{i}"{"" if i == 0 else " hidden"}>{renderizar(aba, contador)}</div>'
+            for i, aba in enumerate(no.filhos))
+        return f'<div class="abas"><nav>{botoes}</nav>{paineis}</div>'
+    if no.tipo == 'aba':
+        return filhos
+    if no.tipo == 'expansor':
+        return f'<details><summary>{html.escape(a["rotulo"])}</summary>{filhos}</details>'
+    if no.tipo == 'oculto':
+        return ''
+    if no.tipo == 'titulo':
+        return f'<h{a["nivel"]}>{html.escape(a["texto"])}</h{a["nivel"]}>'
+    if no.tipo == 'legenda':
+        return f'<p class="legenda">{_markdown_inline(a["texto"])}</p>'
+    if no.tipo == 'markdown':
+        # HTML liberado (unsafe_allow_html) vai como está; o resto é Markdown
+        return a['texto'] if a['html'] else markdown_para_html(a['texto'])
+    if no.tipo == 'alerta':
+        return f'<div class="alerta {a["estilo"]}">{markdown_para_html(a["texto"])}</div>'
+    if no.tipo == 'metrica':
+        delta = '' if a['delta'] is None else \
+            f'<div class="delta {_classe_delta(a["delta"], a["cor_delta"])}">{html.escape(a["delta"])}</div>'
+        ajuda = '' if not a['ajuda'] else f' title="{html.escape(a["ajuda"])}"'
+        return (f'<div class="metrica"{ajuda}><div class="rotulo">{html.escape(a["rotulo"])}</div>'
+                f'<div class="valor">{html.escape(a["valor"])}</div>{delta}</div>')
+    if no.tipo == 'grafico':
+        contador['graficos'] += 1
+        dados = a['figura'].replace('</', '<\\/')
+        return (f'<div class="grafico" id="grafico{contador["graficos"]}"></div>'
+                f'<script type="application/json" data-grafico="grafico{contador["graficos"]}">{dados}</script>')
+    if no.tipo == 'tabela':
+        return f'<div class="tabela-rolagem">{a["html"]}</div>'
+    return filhos
+
+ESTILO = """
+body { margin: 0; font-family: "Source Sans Pro", sans-serif; color: #31333f; }
+.layout { display: flex; min-height: 100vh; }
+aside { width: 260px; flex: none; background: #f0f2f6; padding: 1.5rem 1rem; }
+main { flex: 1; padding: 1.5rem 2rem; min-width: 0; }
+.colunas { display: flex; gap: 1rem; }
+.coluna { flex: 1; min-width: 0; }
+.abas nav { display: flex; gap: .25rem; border-bottom: 1px solid #ddd; margin-bottom: 1rem; flex-wrap: wrap; }
+.aba { border: none; background: none; padding: .5rem .75rem; cursor: pointer; font-size: 1rem; }
+.aba.ativa { border-bottom: 3px solid #ff4b4b; color: #ff4b4b; }
+.metrica { margin: .5rem 0; }
+.metrica .rotulo { font-size: .875rem; }
+.metrica .valor { font-size: 2rem; }
+.delta.positivo { color: #09ab3b; } .delta.negativo { color: #ff2b2b; } .delta.neutro { color: #808495; }
+.alerta { padding: .75rem 1rem; border-radius: .5rem; margin: .5rem 0; }
+.alerta.sucesso { background: #dff5e3; } .alerta.info { background: #e1effe; }
+.alerta.aviso { background: #fff8dc; } .alerta.erro { background: #fde4e4; }
+.legenda { color: #808495; font-size: .875rem; }
+.tabela-rolagem { overflow-x: auto; }
+table.tabela { border-collapse: collapse; font-size: .875rem; }
+table.tabela th, table.tabela td { padding: .25rem .5rem; border-bottom: 1px solid #eee; text-align: right; }
+details { margin: .5rem 0; }
+.grafico { min-height: 450px; }
+"""
+
+SCRIPT = """
+document.querySelectorAll('script[data-grafico]').forEach(function (dados) {
+  var figura = JSON.parse(dados.textContent);
+  Plotly.newPlot(dados.dataset.grafico, figura.data, figura.layout, {responsive: true});
+});
+document.querySelectorAll('.aba').forEach(function (botao) {
+  botao.addEventListener('click', function () {
+    var grupo = botao.dataset.grupo;
+    document.querySelectorAll('.aba[data-grupo="' + grupo + '"]').forEach(function (b) { b.classList.toggle('ativa', b === botao); });
+    document.querySelectorAll('.painel[data-grupo="' + grupo + '"]').forEach(function (painel) {
+      painel.hidden = painel.dataset.indice !== botao.dataset.indice;
+      if (!painel.hidden) painel.querySelectorAll('.grafico').forEach(function (g) { Plotly.Plots.resize(g); });
+    });
+  });
+});
+"""
+
+def montar_html(titulo, sidebar, pagina, caminho_plotly):
+    contador = {'abas': 0, 'graficos': 0}
+    corpo = renderizar(pagina, contador)
+    lateral = renderizar(sidebar, contador)
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(titulo or 'Dashboard')}</title>
+<style>{ESTILO}</style>
+<script src="{caminho_plotly}"></script>
+</head>
+<body>
+<div class="layout">{lateral}<main>{corpo}</main></div>
+<script>{SCRIPT}</script>
+</body>
+</html>
+"""
+
+# --- Contas e assinaturas ---
+
+# Muda quando qualquer CSV da conta, o próprio dashboard ou este exportador mudam. Os benchmarks
+# de cada página comparam a conta com todas as outras: `versao` (relatorios.versao_contas)
+# faz uma mudança em qualquer conta invalidar as páginas de todas.
+def assinatura_conta(pasta, caminho_app, versao):
+    resumo = hashlib.sha256()
+    resumo.update(f"v{VERSAO_EXPORTACAO}".encode())
+    for caminho in (caminho_app, os.path.abspath(__file__), os.path.abspath(relatorios.__file__)):
+        with open(caminho, 'rb') as arquivo:
+            resumo.update(hashlib.sha256(arquivo.read()).digest())
+    for nome in sorted(os.listdir(pasta)):
+        if nome.endswith('.csv'):
+            info = os.stat(os.path.join(pasta, nome))
+            resumo.update(f"{nome}:{info.st_size}:{info.st_mtime_ns}".encode())
+    resumo.update(json.dumps(versao).encode())
+    return resumo.hexdigest()
+
+def ler_manifesto(destino):
+    try:
+        with open(os.path.join(destino, 'manifesto.json'), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+def gravar_arquivo(caminho, conteudo):
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+# --- Exportação ---
+
+# Roda o dashboard para uma conta (num processo separado) e grava index.html + manifesto.json
+def exportar_conta(caminho_app, conta, destino, assinatura, caminho_plotly):
+    os.chdir(os.path.dirname(caminho_app))
+    # Sem prévia de início rápido nem instrumentação na geração estática
+    os.environ['DASHBOARD_INICIO_RAPIDO'] = '0'
+    os.environ['DASHBOARD_PERF'] = '0'
+
+    conta_unica = relatorios.CONTAS_DIR is None
+    sys.modules['streamlit'] = criar_streamlit_estatico(None if conta_unica else conta)
+    globais = runpy.run_path(caminho_app, run_name='__dashboard_estatico__')
+    if not conta_unica and globais.get('conta_atual') != conta:
+        raise RuntimeError(f"o dashboard não reconhece a conta '{conta}'")
+
+    os.makedirs(destino, exist_ok=True)
+    gravar_arquivo(os.path.join(destino, 'index.html'),
+                   montar_html(_estado['titulo'], _estado['sidebar'], _estado['raiz'], caminho_plotly))
+    gravar_arquivo(os.path.join(destino, 'manifesto.json'),
+                   json.dumps({'conta': conta, 'assinatura': assinatura}, ensure_ascii=False))
+    return conta
+
+# plotly.js uma vez por pacote, com a versão no nome (cache longo na CDN)
+def gravar_plotly(saida):
+    import plotly
+    from plotly.offline import get_plotlyjs
+
+    nome = f"plotly-{plotly.__version__}.min.js"
+    caminho = os.path.join(saida, nome)
+    if not os.path.exists(caminho):
+        gravar_arquivo(caminho, get_plotlyjs())
+    return nome
+
+def gravar_indice(saida, contas):
+    itens = ''.join(f'<li><a href="{html.escape(conta)}/index.html">{html.escape(conta)}</a></li>' for conta in contas)
+    gravar_arquivo(os.path.join(saida, 'index.html'), f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>Dashboards</title></head>
+<body><h1>Dashboards por Conta</h1><ul>{itens}</ul></body></html>
+""")
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o dashboard como HTML estático (uma página por conta).")
+    parser.add_argument('saida', nargs='?', default='site', help="pasta de saída (padrão: site)")
+    parser.add_argument('--app', default=os.path.join(PASTA_APP, 'ads5.py'), help="script do dashboard")
+    parser.add_argument('--processos', type=int, default=os.cpu_count(), help="contas exportadas em paralelo")
+    parser.add_argument('--forcar', action='store_true', help="regenera mesmo sem mudanças nas exportações")
+    args = parser.parse_args()
+
+    caminho_app = os.path.abspath(args.app)
+    saida = os.path.abspath(args.saida)
+    os.makedirs(saida, exist_ok=True)
+
+    # Conta única: a pasta atual do dashboard é a do app, como em exportar_conta
+    os.chdir(os.path.dirname(caminho_app))
+    contas = listar_contas()
+    versao = versao_contas()
+    caminho_plotly = f"../{gravar_plotly(saida)}"
+
+    pendentes = {}
+    for conta, pasta in contas.items():
+        destino = os.path.join(saida, conta)
+        assinatura = assinatura_conta(pasta, caminho_app, versao)
+        if args.forcar or ler_manifesto(destino).get('assinatura') != assinatura \
+                or not os.path.exists(os.path.join(destino, 'index.html')):
+            pendentes[conta] = (destino, assinatura)
+
+    falhas = 0
+    if pendentes:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.processos, len(pendentes)))) as executor:
+            futuros = {executor.submit(exportar_conta, caminho_app, conta, destino, assinatura, caminho_plotly): conta
+                       for conta, (destino, assinatura) in pendentes.items()}
+            for futuro in as_completed(futuros):
+                conta = futuros[futuro]
+                try:
+                    futuro.result()
+                    print(f"✔ {conta}")
+                except Exception as erro:
+                    falhas += 1
+                    print(f"✘ {conta}: {erro}", file=sys.stderr)
+
+    gravar_indice(saida, contas)
+    print(f"{len(pendentes) - falhas} conta(s) exportada(s), {len(contas) - len(pendentes)} sem mudanças, {falhas} falha(s).")
+    return 1 if falhas else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
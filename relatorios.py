@@ -0,0 +1,50 @@
+import json
+import os
+
+# Relatórios exportados do Google Ads e definição de conta, compartilhados entre o dashboard
+# (ads5.py) e o exportador estático (exportar_estatico.py). Só biblioteca padrão: o exportador
+# usa este módulo sem carregar o dashboard.
+
+ARQUIVOS = {
+    'campanhas': 'Campanhas(2025.07.08-2025.10.17).csv',
+    'dispositivos': 'Dispositivos(2025.07.08-2025.10.17).csv',
+    'idade': 'Informações_demográficas(Idade_2025.07.08-2025.10.17).csv',
+    'sexo': 'Informações_demográficas(Sexo_2025.07.08-2025.10.17).csv',
+    'sexo_idade': 'Informações_demográficas(Sexo_Idade_2025.07.08-2025.10.17).csv',
+    'palavras_chave': 'Palavras-chave_de_pesquisa(2025.07.08-2025.10.17).csv',
+    'pesquisas': 'Pesquisas(Palavra_2025.07.08-2025.10.17).csv',
+    'termos_pesquisa': 'Pesquisas(Pesquisar_2025.07.08-2025.10.17).csv',
+    'dia_hora': 'Dia_e_hora(Dia_2025.07.08-2025.10.17).csv',
+    'hora': 'Dia_e_hora(Hora_2025.07.08-2025.10.17).csv',
+    'dia_hora_detalhado': 'Dia_e_hora(Dia_Hora_2025.07.08-2025.10.17).csv',
+}
+
+# Caminho absoluto: o exportador troca de pasta antes de rodar o dashboard
+CONTAS_DIR = os.path.abspath(os.environ['DASHBOARD_CONTAS_DIR']) if os.environ.get('DASHBOARD_CONTAS_DIR') else None
+CONTA_PADRAO = 'padrão'
+
+# Contas disponíveis: cada subpasta de DASHBOARD_CONTAS_DIR com as exportações, ou a pasta atual
+def listar_contas():
+    if not CONTAS_DIR:
+        return {CONTA_PADRAO: '.'}
+    contas = {}
+    for nome in sorted(os.listdir(CONTAS_DIR)):
+        pasta = os.path.join(CONTAS_DIR, nome)
+        if os.path.isfile(os.path.join(pasta, ARQUIVOS['campanhas'])):
+            contas[nome] = pasta
+    return contas
+
+# Tamanho e data de modificação dos relatórios; muda sempre que uma exportação é trocada
+def assinatura_fontes(pasta='.'):
+    assinatura = []
+    for tabela, arquivo in sorted(ARQUIVOS.items()):
+        try:
+            info = os.stat(os.path.join(pasta, arquivo))
+            assinatura.append([tabela, info.st_size, info.st_mtime_ns])
+        except OSError:
+            assinatura.append([tabela, None, None])
+    return assinatura
+
+# Assinatura de todas as contas: muda quando qualquer conta entra, sai ou troca um relatório
+def versao_contas():
+    return tuple((conta, pasta, json.dumps(assinatura_fontes(pasta))) for conta, pasta in listar_contas().items())